@@ -0,0 +1,414 @@
+"""Benchmarks for the Shinobi integration against a local fake Shinobi server.
+
+Run from the repository root with Home Assistant and the integration's
+requirements installed:
+
+    python -m benchmarks.bench --monitors 10,50,100 --output bench.json
+
+Every scenario starts a fresh Home Assistant instance and fake server, and
+the results are written as JSON so runs can be compared with each other.
+"""
+import argparse
+import asyncio
+from collections import Counter
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant import auth, config_entries  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.setup import async_setup_component  # noqa: E402
+
+from custom_components.shinobi.discovery import (  # noqa: E402
+    async_discover,
+    parse_subnets,
+)
+from custom_components.shinobi.const import (  # noqa: E402
+    CONF_ENDPOINTS,
+    CONF_GROUP,
+    CONF_SNAPSHOT_TTL,
+    CONF_TOKEN,
+    DOMAIN,
+)
+
+from .fake_shinobi import API_KEY, GROUP, FakeShinobi  # noqa: E402
+
+
+def free_port() -> int:
+    """ Return a local TCP port that is currently unused. """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """ Return the nearest-rank percentile of values. """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Harness:
+    """ A Home Assistant instance with one Shinobi entry on a fake server. """
+
+    def __init__(self, server: FakeShinobi, options: Dict[str, Any]):
+        self.server = server
+        self.options = options
+        self.hass = None
+        self.entry = None
+        self._config_dir = tempfile.TemporaryDirectory()
+
+    async def async_start(self) -> float:
+        """ Start Home Assistant and return the entry setup time. """
+        hass = self.hass = HomeAssistant()
+        hass.config.config_dir = self._config_dir.name
+        hass.config.skip_pip = True
+        # the integration signs urls on behalf of a system user
+        hass.auth = await auth.auth_manager_from_config(
+            hass, [{"type": "homeassistant"}], []
+        )
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+        await hass.config_entries.async_initialize()
+        await async_setup_component(
+            hass,
+            "http",
+            {"http": {"server_host": "127.0.0.1", "server_port": free_port()}},
+        )
+        await async_setup_component(hass, "ffmpeg", {})
+        await async_setup_component(hass, "camera", {})
+
+        self.entry = config_entries.ConfigEntry(
+            version=1,
+            domain=DOMAIN,
+            title="Benchmark",
+            data={
+                "host": "127.0.0.1",
+                "port": self.server.port,
+                CONF_TOKEN: API_KEY,
+                CONF_GROUP: GROUP,
+            },
+            source=config_entries.SOURCE_USER,
+            connection_class=config_entries.CONN_CLASS_LOCAL_POLL,
+            system_options={},
+            options=self.options,
+        )
+        started = time.perf_counter()
+        await hass.config_entries.async_add(self.entry)
+        await hass.async_block_till_done()
+        return time.perf_counter() - started
+
+    @property
+    def cameras(self) -> list:
+        """ Return the camera entities created by the entry. """
+        return list(self.hass.data[DOMAIN][self.entry.entry_id]["cameras"].values())
+
+    async def async_stop(self):
+        """ Unload the entry and stop Home Assistant. """
+        await self.hass.config_entries.async_unload(self.entry.entry_id)
+        await self.hass.async_stop(force=True)
+        self._config_dir.cleanup()
+
+
+async def bench_setup(monitor_counts: List[int]) -> List[Dict[str, Any]]:
+    """ Measure async_setup_entry time against the number of monitors. """
+    results = []
+    for count in monitor_counts:
+        server = FakeShinobi(monitors=count)
+        await server.start()
+        harness = Harness(server, {})
+        try:
+            seconds = await harness.async_start()
+            results.append(
+                {
+                    "monitors": count,
+                    "seconds": seconds,
+                    "cameras": len(harness.cameras),
+                    "api_requests": server.requests["monitors"]
+                    + server.requests["monitor"],
+                }
+            )
+        finally:
+            await harness.async_stop()
+            await server.stop()
+    return results
+
+
+async def bench_snapshots(
+    callers: int, rounds: int, latency: float, ttl: float
+) -> Dict[str, Any]:
+    """ Measure async_camera_image latency with many concurrent callers. """
+    server = FakeShinobi(monitors=1, snapshot_latency=latency)
+    await server.start()
+    harness = Harness(server, {CONF_SNAPSHOT_TTL: ttl})
+    try:
+        await harness.async_start()
+        camera = harness.cameras[0]
+        server.requests.clear()
+
+        latencies = []
+
+        async def call():
+            started = time.perf_counter()
+            await camera.async_camera_image()
+            latencies.append(time.perf_counter() - started)
+
+        for _ in range(rounds):
+            await asyncio.gather(*[call() for _ in range(callers)])
+            await asyncio.sleep(ttl)
+
+        return {
+            "callers": callers,
+            "rounds": rounds,
+            "latency": latency,
+            "ttl": ttl,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.mean(latencies),
+            "upstream_requests": server.requests["snapshot"],
+        }
+    finally:
+        await harness.async_stop()
+        await server.stop()
+
+
+async def bench_mjpeg(viewers: int, duration: float, fps: float) -> Dict[str, Any]:
+    """ Measure throughput and memory with many simultaneous MJPEG viewers. """
+    server = FakeShinobi(monitors=1, mjpeg_fps=fps)
+    await server.start()
+    harness = Harness(server, {})
+    runner = None
+    try:
+        await harness.async_start()
+        camera = harness.cameras[0]
+        server.requests.clear()
+
+        app = web.Application()
+        app.router.add_get("/", camera.handle_async_mjpeg_stream)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+        received = [0] * viewers
+
+        async def view(index: int, session: aiohttp.ClientSession):
+            async with session.get(url) as response:
+                deadline = time.perf_counter() + duration
+                while time.perf_counter() < deadline:
+                    chunk = await response.content.read(64 * 1024)
+                    if not chunk:
+                        break
+                    received[index] += len(chunk)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*[view(i, session) for i in range(viewers)])
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "viewers": viewers,
+            "duration": elapsed,
+            "bytes": sum(received),
+            "bytes_per_second": sum(received) / elapsed,
+            "min_viewer_bytes": min(received),
+            "upstream_connections": server.requests["mjpeg"],
+            "peak_memory": peak,
+            "stream_buffer_peak": camera._metrics.stream_buffer_peak,
+        }
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await harness.async_stop()
+        await server.stop()
+
+
+async def bench_nodes(nodes: int, monitors: int, rounds: int) -> Dict[str, Any]:
+    """ Measure how snapshots spread over several nodes and fail over. """
+    servers = [FakeShinobi(monitors=monitors) for _ in range(nodes)]
+    for server in servers:
+        await server.start()
+    harness = Harness(
+        servers[0],
+        {
+            CONF_SNAPSHOT_TTL: 0,
+            CONF_ENDPOINTS: ",".join(
+                f"127.0.0.1:{server.port}" for server in servers[1:]
+            ),
+        },
+    )
+    try:
+        await harness.async_start()
+        cameras = harness.cameras
+
+        async def refresh() -> int:
+            images = await asyncio.gather(
+                *[camera.async_refresh_snapshot() for camera in cameras]
+            )
+            return sum(image is None for image in images)
+
+        for server in servers:
+            server.requests.clear()
+        failed = 0
+        for _ in range(rounds):
+            failed += await refresh()
+        spread = [server.requests["snapshot"] for server in servers]
+
+        # the configured host drops out, the other nodes take over
+        await servers[0].stop()
+        started = time.perf_counter()
+        failed_over = 0
+        for _ in range(rounds):
+            failed_over += await refresh()
+
+        return {
+            "nodes": nodes,
+            "monitors": monitors,
+            "rounds": rounds,
+            "snapshots_per_node": spread,
+            "failed": failed,
+            "failed_after_node_loss": failed_over,
+            "seconds_after_node_loss": time.perf_counter() - started,
+        }
+    finally:
+        await harness.async_stop()
+        for server in servers:
+            await server.stop()
+
+
+async def bench_events(monitors: int, detections: int) -> Dict[str, Any]:
+    """ Count the state writes of each entity for a burst of socket events. """
+    server = FakeShinobi(monitors=monitors)
+    await server.start()
+    harness = Harness(server, {})
+    try:
+        await harness.async_start()
+        hass = harness.hass
+        events = hass.data[DOMAIN][harness.entry.entry_id]["events"]
+        for _ in range(100):
+            if events.connected:
+                break
+            await asyncio.sleep(0.05)
+
+        writes: Counter = Counter()
+        hass.bus.async_listen(
+            EVENT_STATE_CHANGED,
+            lambda event: writes.update([event.data["entity_id"]]),
+        )
+        started = time.perf_counter()
+        mids = [server.monitor(index)["mid"] for index in range(monitors)]
+        detection = {"f": "detector_trigger", "details": {"reason": "motion"}}
+        for _ in range(detections):
+            await server.emit([{**detection, "id": mid} for mid in mids])
+            await asyncio.sleep(0.01)
+        await server.emit(
+            [{"f": "monitor_status", "id": mid, "status": "Recording"} for mid in mids]
+        )
+        await asyncio.sleep(0.1)
+        await hass.async_block_till_done()
+
+        per_domain: Dict[str, List[int]] = {}
+        for entity_id in hass.states.async_entity_ids(["camera", "binary_sensor"]):
+            per_domain.setdefault(entity_id.split(".")[0], []).append(
+                writes[entity_id]
+            )
+        return {
+            "monitors": monitors,
+            "detections": detections,
+            "seconds": time.perf_counter() - started,
+            "connected": events.connected,
+            # per entity: the status change for cameras, turning on for sensors
+            "camera_writes": per_domain.get("camera", []),
+            "motion_writes": per_domain.get("binary_sensor", []),
+            "expected_writes": 1,
+        }
+    finally:
+        await harness.async_stop()
+        await server.stop()
+
+
+async def bench_discovery(servers: int, closed_ports: int) -> Dict[str, Any]:
+    """ Measure a discovery scan of fake servers mixed with closed ports. """
+    fakes = [FakeShinobi(monitors=1) for _ in range(servers)]
+    for fake in fakes:
+        await fake.start()
+    ports = [fake.port for fake in fakes] + [free_port() for _ in range(closed_ports)]
+    try:
+        started = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            found = await async_discover(
+                session, parse_subnets("127.0.0.1/32"), ports, skip=[]
+            )
+        return {
+            "targets": len(ports),
+            "seconds": time.perf_counter() - started,
+            "found": len(found),
+            "expected": servers,
+        }
+    finally:
+        for fake in fakes:
+            await fake.stop()
+
+
+async def async_main(args: argparse.Namespace) -> Dict[str, Any]:
+    """ Run every scenario and collect the results. """
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "setup": await bench_setup([int(n) for n in args.monitors.split(",")]),
+        "snapshots": await bench_snapshots(
+            args.callers, args.rounds, args.snapshot_latency, args.snapshot_ttl
+        ),
+        "mjpeg": await bench_mjpeg(args.viewers, args.duration, args.fps),
+        "discovery": await bench_discovery(args.servers, args.closed_ports),
+        "nodes": await bench_nodes(args.nodes, args.node_monitors, args.rounds),
+        "events": await bench_events(args.event_monitors, args.detections),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--monitors", default="10,50,100")
+    parser.add_argument("--callers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--snapshot-latency", type=float, default=0.05)
+    parser.add_argument("--snapshot-ttl", type=float, default=1)
+    parser.add_argument("--viewers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--servers", type=int, default=5)
+    parser.add_argument("--closed-ports", type=int, default=200)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--node-monitors", type=int, default=20)
+    parser.add_argument("--event-monitors", type=int, default=20)
+    parser.add_argument("--detections", type=int, default=20)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Local stand-in for the Shinobi API used by the benchmarks."""
+import asyncio
+from collections import Counter
+import json
+from typing import Dict, List
+
+from aiohttp import web
+
+API_KEY = "benchmark"
+GROUP = "bench"
+
+
+def fake_jpeg(size: int) -> bytes:
+    """ Return a JPEG shaped blob of roughly size bytes. """
+    return b"\xff\xd8" + b"\x00" * max(0, size - 4) + b"\xff\xd9"
+
+
+class FakeShinobi:
+    """ Serve monitors, JPEG snapshots, MJPEG streams and the event socket. """
+
+    def __init__(
+        self,
+        monitors: int = 10,
+        snapshot_latency: float = 0.05,
+        snapshot_size: int = 200 * 1024,
+        api_latency: float = 0.01,
+        mjpeg_fps: float = 10,
+        frame_size: int = 100 * 1024,
+    ):
+        self.monitors = monitors
+        self.snapshot_latency = snapshot_latency
+        self.api_latency = api_latency
+        self.mjpeg_fps = mjpeg_fps
+        self.snapshot = fake_jpeg(snapshot_size)
+        self.frame = fake_jpeg(frame_size)
+        self.requests: Counter = Counter()
+        self.port = None
+        self._runner = None
+        self._sockets = set()
+
+        app = web.Application()
+        app.router.add_get("/", self._landing)
+        app.router.add_get("/{key}/monitor/{group}", self._monitors)
+        app.router.add_get("/{key}/monitor/{group}/{mid}", self._monitor)
+        app.router.add_get("/{key}/jpeg/{group}/{mid}/s.jpg", self._jpeg)
+        app.router.add_get("/{key}/mjpeg/{group}/{mid}", self._mjpeg)
+        app.router.add_get("/{key}/videos/{group}", self._videos)
+        app.router.add_get("/socket.io/", self._socket)
+        self._app = app
+
+    def monitor(self, index: int) -> Dict:
+        """ Return the API representation of a monitor. """
+        mid = f"mon{index}"
+        return {
+            "mid": mid,
+            "ke": GROUP,
+            "name": f"Benchmark {index}",
+            "type": "h264",
+            "mode": "start",
+            "status": "Watching",
+            "snapshot": f"/{API_KEY}/jpeg/{GROUP}/{mid}/s.jpg",
+            "streams": [f"/{API_KEY}/mjpeg/{GROUP}/{mid}"],
+            "details": json.dumps({"stream_type": "mjpeg"}),
+        }
+
+    async def start(self):
+        """ Start serving on a free local port. """
+        self._runner = web.AppRunner(self._app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """ Stop serving. """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _landing(self, request: web.Request):
+        self.requests["landing"] += 1
+        return web.Response(
+            text="<html><head><title>Shinobi</title></head><body></body></html>",
+            content_type="text/html",
+        )
+
+    def _check(self, request: web.Request):
+        if request.match_info["key"] != API_KEY:
+            raise web.HTTPUnauthorized()
+
+    async def _monitors(self, request: web.Request):
+        self._check(request)
+        self.requests["monitors"] += 1
+        await asyncio.sleep(self.api_latency)
+        return web.json_response([self.monitor(i) for i in range(self.monitors)])
+
+    async def _monitor(self, request: web.Request):
+        self._check(request)
+        self.requests["monitor"] += 1
+        await asyncio.sleep(self.api_latency)
+        index = int(request.match_info["mid"][3:])
+        return web.json_response([self.monitor(index)])
+
+    async def _jpeg(self, request: web.Request):
+        self._check(request)
+        self.requests["snapshot"] += 1
+        await asyncio.sleep(self.snapshot_latency)
+        return web.Response(body=self.snapshot, content_type="image/jpeg")
+
+    async def _mjpeg(self, request: web.Request):
+        self._check(request)
+        self.requests["mjpeg"] += 1
+        response = web.StreamResponse()
+        response.content_type = "multipart/x-mixed-replace;boundary=shinobi"
+        await response.prepare(request)
+        part = (
+            b"--shinobi\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+            % len(self.frame)
+            + self.frame
+            + b"\r\n"
+        )
+        try:
+            while True:
+                await response.write(part)
+                await asyncio.sleep(1 / self.mjpeg_fps)
+        except (asyncio.CancelledError, ConnectionResetError):
+            pass
+        return response
+
+    async def _videos(self, request: web.Request):
+        self._check(request)
+        self.requests["videos"] += 1
+        return web.json_response({"ok": True, "videos": []})
+
+    async def _socket(self, request: web.Request):
+        self.requests["socket"] += 1
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        await socket.send_str('0{"sid":"bench","pingInterval":25000,"pingTimeout":5000}')
+        await socket.send_str("40")
+        self._sockets.add(socket)
+        try:
+            async for message in socket:
+                if message.data == "2":
+                    await socket.send_str("3")
+        finally:
+            self._sockets.discard(socket)
+        return socket
+
+    async def emit(self, events: List[Dict]):
+        """ Push synthetic events to every connected event socket. """
+        for event in events:
+            data = "42" + json.dumps(["f", {"ke": GROUP, **event}])
+            for socket in list(self._sockets):
+                await socket.send_str(data)
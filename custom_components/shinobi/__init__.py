@@ -1,29 +1,79 @@
 """Shinobi Integration for Home Assistant"""
 import asyncio
+from collections import defaultdict
 import logging
 from datetime import timedelta
+import os
+from time import monotonic
+from typing import Dict, Optional, Set
 
 import homeassistant.helpers.device_registry as dr
+from homeassistant.components.ffmpeg import DATA_FFMPEG
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
     CONF_HOST,
     CONF_PORT,
     CONF_SCAN_INTERVAL,
 )
+from homeassistant.core import ServiceCall
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import homeassistant.helpers.config_validation as cv
 from aiohttp.client_exceptions import ServerDisconnectedError
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from pyshinobicctvapi import Client as ShinobiClient, Connection as ShinobiConnection
+import voluptuous as vol
+from pyshinobicctvapi import Connection as ShinobiConnection
 
+from .breaker import EntryBreakers
+from .coordinator import ShinobiMonitorCoordinator
+from .diagnostics import async_register_websocket_commands
+from .endpoints import Endpoint, EndpointPool, parse_endpoints
+from .events import ShinobiEventClient, socket_url
+from .metrics import EntryMetrics
+from .prefetch import SnapshotPrefetcher
+from .probe import StreamProber
+from .scheduler import FFmpegScheduler
+from .recordings import RecordingIndex
+from .session import ShinobiSessions
+from .signing import async_setup_signing
+from .snapshot import SnapshotCache
+from .views import (
+    ShinobiHlsView,
+    ShinobiRecordingView,
+    ShinobiSnapshotView,
+    ShinobiThumbnailView,
+)
 from .const import (
+    ATTR_ENTRY_ID,
+    CONF_API_CONNECTIONS,
+    CONF_ENDPOINTS,
+    CONF_PREFETCH,
+    CONF_STREAM_CONNECTIONS,
+    DATA_FFMPEG_SCHEDULER,
+    DATA_HLS_CACHE,
+    DATA_PREFETCH_LIMIT,
+    DATA_REFRESH_HOST_LIMITS,
+    DATA_REFRESH_LIMIT,
+    DEFAULT_API_CONNECTIONS,
+    DEFAULT_HLS_CACHE_SIZE,
+    DEFAULT_PREFETCH,
+    DEFAULT_PREFETCH_IDLE,
+    DEFAULT_STREAM_CONNECTIONS,
     DOMAIN,
+    ENRICH_MAX_CONCURRENCY,
     SHINOBI_PLATFORMS,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SNAPSHOT_CACHE_SIZE,
+    DATA_SNAPSHOT_CACHE,
     CONF_TOKEN,
     CONF_GROUP,
     DEFAULT_BRAND,
+    PREFETCH_MAX_CONCURRENCY,
+    PROBE_MAX_CONCURRENCY,
+    REFRESH_HOST_CONCURRENCY,
+    REFRESH_MAX_CONCURRENCY,
+    SERVICE_UPDATE,
+    STREAM_PROBE_TIMEOUT,
 )
 
 ATTRIBUTION = f"Data provided by {DEFAULT_BRAND}."
@@ -32,15 +82,42 @@ _LOGGER = logging.getLogger(__name__)
 
 SCAN_INTERVAL = timedelta(seconds=10)
 
+SERVICE_UPDATE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    }
+)
+
 
 async def async_setup(hass: HomeAssistantType, config: ConfigType) -> bool:
     """Set up configured Shinobi CCTV."""
 
+    hass.data[DATA_SNAPSHOT_CACHE] = SnapshotCache(DEFAULT_SNAPSHOT_CACHE_SIZE)
+    # segments get their own budget so live viewers never evict snapshots
+    hass.data[DATA_HLS_CACHE] = SnapshotCache(DEFAULT_HLS_CACHE_SIZE)
+    # shared by every entry so prefetching never floods the event loop
+    hass.data[DATA_PREFETCH_LIMIT] = asyncio.Semaphore(PREFETCH_MAX_CONCURRENCY)
+    # created once so concurrent service calls share the caps instead of stacking
+    hass.data[DATA_REFRESH_LIMIT] = asyncio.Semaphore(REFRESH_MAX_CONCURRENCY)
+    hass.data[DATA_REFRESH_HOST_LIMITS] = defaultdict(
+        lambda: asyncio.Semaphore(REFRESH_HOST_CONCURRENCY)
+    )
+    # one decoder per core, shared by the cameras of every entry
+    hass.data[DATA_FFMPEG_SCHEDULER] = FFmpegScheduler(os.cpu_count() or 2)
+    await async_setup_signing(hass)
+    async_register_websocket_commands(hass)
+    hass.http.register_view(ShinobiSnapshotView())
+    hass.http.register_view(ShinobiThumbnailView())
+    hass.http.register_view(ShinobiHlsView())
+    hass.http.register_view(ShinobiRecordingView())
+
     return True
 
 
 async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool:
     """Set up Shinobi platforms as config entry."""
+    setup_started = monotonic()
 
     if not entry.options:
         hass.config_entries.async_update_entry(
@@ -52,19 +129,100 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
             },
         )
 
-    client = ShinobiClient(
-        ShinobiConnection(
-            entry.data[CONF_HOST],
-            entry.data[CONF_PORT],
-            entry.data[CONF_TOKEN],
-            entry.data[CONF_GROUP],
-            async_get_clientsession(hass),
-        ),
+    sessions = ShinobiSessions(
+        hass,
+        entry.options.get(CONF_API_CONNECTIONS, DEFAULT_API_CONNECTIONS),
+        entry.options.get(CONF_STREAM_CONNECTIONS, DEFAULT_STREAM_CONNECTIONS),
+    )
+    # the configured host first, then the other nodes serving the same group
+    nodes = [(entry.data[CONF_HOST], entry.data[CONF_PORT])]
+    nodes += parse_endpoints(entry.options.get(CONF_ENDPOINTS, ""))
+    endpoints = EndpointPool(
+        hass,
+        sessions.api,
+        [
+            Endpoint(
+                hass,
+                host,
+                port,
+                ShinobiConnection(
+                    host,
+                    port,
+                    entry.data[CONF_TOKEN],
+                    entry.data[CONF_GROUP],
+                    sessions.api,
+                ),
+            )
+            for host, port in nodes
+        ],
     )
     _LOGGER.debug("Connected to Shinobi CCTV Platform")
 
+    metrics = EntryMetrics()
+    breakers = EntryBreakers(hass, f"{entry.data[CONF_HOST]}:{entry.data[CONF_PORT]}")
+    coordinator = ShinobiMonitorCoordinator(
+        hass,
+        endpoints,
+        timedelta(
+            seconds=entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        ),
+        metrics.api,
+        breakers.host,
+    )
+    await coordinator.async_refresh()
+    if not coordinator.last_update_success:
+        breakers.async_stop()
+        endpoints.async_stop()
+        await sessions.async_close()
+        raise ConfigEntryNotReady
+    endpoints.async_start()
+
+    events = ShinobiEventClient(
+        hass,
+        sessions.stream,
+        # reconnects go to whichever node is healthy at the time
+        lambda: socket_url(endpoints.best.base_url, None),
+        entry.data[CONF_TOKEN],
+        entry.data[CONF_GROUP],
+    )
+    events.async_start()
+    # started, stopped or deleted monitors show up as status changes
+    remove_status_listener = events.async_subscribe_status(
+        lambda: hass.async_create_task(coordinator.async_request_refresh())
+    )
+
+    cameras = {}
+    prefetcher = SnapshotPrefetcher(
+        hass,
+        cameras,
+        entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+        DEFAULT_PREFETCH_IDLE,
+        hass.data[DATA_PREFETCH_LIMIT],
+    )
+    if entry.options.get(CONF_PREFETCH, DEFAULT_PREFETCH):
+        prefetcher.async_start()
+
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
-        "client": client,
+        "endpoints": endpoints,
+        "sessions": sessions,
+        "coordinator": coordinator,
+        "events": events,
+        "remove_status_listener": remove_status_listener,
+        "unload_callbacks": [],
+        "metrics": metrics,
+        "breakers": breakers,
+        "recordings": RecordingIndex(hass, endpoints),
+        "cameras": cameras,
+        "connection_settings": _connection_settings(entry),
+        "prefetcher": prefetcher,
+        "setup_started": setup_started,
+        "enrich_limit": asyncio.Semaphore(ENRICH_MAX_CONCURRENCY),
+        "prober": StreamProber(
+            hass.data[DATA_FFMPEG].binary,
+            hass.data[DATA_FFMPEG_SCHEDULER],
+            PROBE_MAX_CONCURRENCY,
+            STREAM_PROBE_TIMEOUT,
+        ),
     }
 
     for platform in SHINOBI_PLATFORMS:
@@ -75,23 +233,170 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
     if not entry.update_listeners:
         entry.add_update_listener(async_update_options)
 
-    if hass.services.has_service(DOMAIN, "update"):
+    if hass.services.has_service(DOMAIN, SERVICE_UPDATE):
         return True
 
-    async def async_refresh_all(_):
+    async def async_refresh_all(call: ServiceCall):
         """Refresh all client data."""
-        for info in hass.data[DOMAIN].values():
-            """ TODO """
+        targets = await _async_resolve_targets(hass, call)
+        global_limit = hass.data[DATA_REFRESH_LIMIT]
+        host_limits = hass.data[DATA_REFRESH_HOST_LIMITS]
+
+        started = monotonic()
+        results = await asyncio.gather(
+            *[
+                _async_refresh_entry(
+                    hass,
+                    entry_id,
+                    monitor_ids,
+                    global_limit,
+                    host_limits[
+                        hass.config_entries.async_get_entry(entry_id).data[CONF_HOST]
+                    ],
+                )
+                for entry_id, monitor_ids in targets.items()
+            ]
+        )
+        _LOGGER.info(
+            "Refreshed %d Shinobi entries in %.2fs, %d failed",
+            len(results),
+            monotonic() - started,
+            results.count(False),
+        )
 
     # register service
-    hass.services.async_register(DOMAIN, "update", async_refresh_all)
+    hass.services.async_register(
+        DOMAIN, SERVICE_UPDATE, async_refresh_all, schema=SERVICE_UPDATE_SCHEMA
+    )
 
     return True
 
 
+async def _async_resolve_targets(
+    hass: HomeAssistantType, call: ServiceCall
+) -> Dict[str, Optional[Set[str]]]:
+    """ Map the targeted entry ids to the monitor ids to refresh, None for all. """
+    entry_ids = call.data.get(ATTR_ENTRY_ID)
+    entity_ids = call.data.get(ATTR_ENTITY_ID)
+    if not entry_ids and not entity_ids:
+        return {entry_id: None for entry_id in hass.data[DOMAIN]}
+
+    targets: Dict[str, Optional[Set[str]]] = {
+        entry_id: None for entry_id in entry_ids or () if entry_id in hass.data[DOMAIN]
+    }
+    if entity_ids:
+        registry = await hass.helpers.entity_registry.async_get_registry()
+        devices = await hass.helpers.device_registry.async_get_registry()
+        for entity_id in entity_ids:
+            entity = registry.async_get(entity_id)
+            if entity is None or entity.config_entry_id not in hass.data[DOMAIN]:
+                _LOGGER.warning("%s is not a Shinobi entity", entity_id)
+                continue
+            # sensors share their camera's device, which names the monitor
+            device = devices.async_get(entity.device_id) if entity.device_id else None
+            monitor_id = next(
+                (
+                    identifier[-1]
+                    for identifier in (device.identifiers if device else ())
+                    if identifier[0] == DOMAIN
+                ),
+                None,
+            )
+            if monitor_id is None:
+                _LOGGER.warning("%s does not belong to a Shinobi monitor", entity_id)
+                continue
+            monitor_ids = targets.setdefault(entity.config_entry_id, set())
+            if monitor_ids is not None:
+                monitor_ids.add(monitor_id)
+    return targets
+
+
+async def _async_refresh_entry(
+    hass: HomeAssistantType,
+    entry_id: str,
+    monitor_ids: Optional[Set[str]],
+    global_limit: asyncio.Semaphore,
+    host_limit: asyncio.Semaphore,
+) -> bool:
+    """ Refresh the monitor list, streams and snapshots of one entry. """
+    info = hass.data[DOMAIN][entry_id]
+    coordinator: ShinobiMonitorCoordinator = info["coordinator"]
+    started = monotonic()
+
+    async def limited(coro):
+        async with global_limit, host_limit:
+            return await coro
+
+    await limited(coordinator.async_refresh())
+    if not coordinator.last_update_success:
+        _LOGGER.warning(
+            "Refreshing Shinobi entry %s failed after %.2fs",
+            entry_id,
+            monotonic() - started,
+        )
+        return False
+
+    cameras = [
+        camera
+        for monitor_id, camera in info["cameras"].items()
+        if monitor_ids is None or monitor_id in monitor_ids
+    ]
+    results = await asyncio.gather(
+        *[limited(camera.async_refresh_snapshot()) for camera in cameras]
+    )
+    failed = [camera.name for camera, image in zip(cameras, results) if image is None]
+    if failed:
+        _LOGGER.warning(
+            "Refreshed Shinobi entry %s in %.2fs, snapshots failed for: %s",
+            entry_id,
+            monotonic() - started,
+            ", ".join(failed),
+        )
+        return False
+
+    _LOGGER.info(
+        "Refreshed Shinobi entry %s in %.2fs (%d snapshots)",
+        entry_id,
+        monotonic() - started,
+        len(cameras),
+    )
+    return True
+
+
+def _connection_settings(entry: ConfigEntry) -> tuple:
+    """ Return what the client and its connection pools were built from. """
+    return (
+        dict(entry.data),
+        entry.options.get(CONF_ENDPOINTS, ""),
+        entry.options.get(CONF_API_CONNECTIONS, DEFAULT_API_CONNECTIONS),
+        entry.options.get(CONF_STREAM_CONNECTIONS, DEFAULT_STREAM_CONNECTIONS),
+    )
+
+
 async def async_update_options(hass: HomeAssistantType, entry: ConfigEntry):
-    """Update options."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Update options, reloading only when the connection changed."""
+    info = hass.data[DOMAIN].get(entry.entry_id)
+    if info is None or _connection_settings(entry) != info["connection_settings"]:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    scan_interval = entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+    coordinator: ShinobiMonitorCoordinator = info["coordinator"]
+    if coordinator.update_interval != timedelta(seconds=scan_interval):
+        coordinator.update_interval = timedelta(seconds=scan_interval)
+        # refreshing reschedules the next poll with the new interval
+        await coordinator.async_refresh()
+
+    prefetcher: SnapshotPrefetcher = info["prefetcher"]
+    prefetcher.interval = scan_interval
+    if entry.options.get(CONF_PREFETCH, DEFAULT_PREFETCH):
+        prefetcher.async_start()
+    else:
+        prefetcher.async_stop()
+
+    for camera in info["cameras"].values():
+        await camera.async_options_updated()
+    _LOGGER.debug("Applied options of %s without reloading", entry.title)
 
 
 async def async_unload_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool:
@@ -108,13 +413,21 @@ async def async_unload_entry(hass: HomeAssistantType, entry: ConfigEntry) -> boo
     if not unload_ok:
         return False
 
-    hass.data[DOMAIN][entry.entry_id].client.close()
-    hass.data[DOMAIN].pop(entry.entry_id)
+    info = hass.data[DOMAIN].pop(entry.entry_id)
+    info["remove_status_listener"]()
+    for unload_callback in info["unload_callbacks"]:
+        unload_callback()
+    await info["events"].async_stop()
+    info["prefetcher"].async_stop()
+    info["breakers"].async_stop()
+    info["endpoints"].async_stop()
+    info["recordings"].async_stop()
+    await info["sessions"].async_close()
 
     if len(hass.data[DOMAIN]) != 0:
         return True
 
     # Last entry unloaded, clean up service
-    hass.services.async_remove(DOMAIN, "update")
+    hass.services.async_remove(DOMAIN, SERVICE_UPDATE)
 
     return True
\ No newline at end of file
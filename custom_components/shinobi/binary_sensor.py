@@ -0,0 +1,126 @@
+"""Shinobi motion sensors for Home Assistant"""
+import logging
+
+from homeassistant.components.binary_sensor import (
+    DEVICE_CLASS_MOTION,
+    BinarySensorEntity,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+from pyshinobicctvapi.monitors import Monitor
+
+from .const import (
+    ATTR_CONFIDENCE,
+    ATTR_LAST_DETECTION,
+    ATTR_OBJECTS,
+    ATTR_PLUGIN,
+    ATTR_REASON,
+    CONF_MOTION_OFF_DELAY,
+    DEFAULT_MOTION_OFF_DELAY,
+)
+from .entity import EntityMixin as ShinobiEntityMixin, async_add_monitor_entities
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Add motion sensors for Shinobi"""
+
+    async_add_monitor_entities(
+        hass,
+        entry,
+        async_add_entities,
+        lambda monitor: [ShinobiMotionSensor(entry.entry_id, monitor)],
+    )
+
+
+class ShinobiMotionSensor(ShinobiEntityMixin[Monitor], BinarySensorEntity):
+    """ Motion/object detection of a Shinobi monitor. """
+
+    def __init__(self, config_entry_id: str, monitor: Monitor):
+        """ Initialize the sensor. """
+        super().__init__(config_entry_id, monitor)
+        self._is_on = False
+        self._detection = None
+        self._cancel_off = None
+
+    async def async_will_remove_from_hass(self):
+        """ Disconnect callbacks. """
+        await super().async_will_remove_from_hass()
+        if self._cancel_off is not None:
+            self._cancel_off()
+            self._cancel_off = None
+
+    @callback
+    def _handle_event_update(self):
+        """ Turn on for a new detection, and only write state on transitions. """
+        detection = self.events.detections.get(self._device.id)
+        if detection is None or detection is self._detection:
+            return
+
+        # a busy camera keeps extending the off timer without writing state
+        self._detection = detection
+        if self._cancel_off is not None:
+            self._cancel_off()
+        self._cancel_off = async_call_later(
+            self.hass,
+            self.config_entry.options.get(
+                CONF_MOTION_OFF_DELAY, DEFAULT_MOTION_OFF_DELAY
+            ),
+            self._async_turn_off,
+        )
+
+        if not self._is_on:
+            self._is_on = True
+            self._update_callback()
+
+    @callback
+    def _async_turn_off(self, _now):
+        self._cancel_off = None
+        self._is_on = False
+        self._update_callback()
+
+    @property
+    def name(self):
+        """ Return the name of this sensor. """
+        return f"{self._device.name} Motion"
+
+    @property
+    def unique_id(self):
+        """ Return as unique id. """
+        return f"{self._device.id}_motion"
+
+    @property
+    def device_class(self):
+        """ Return the class of this sensor. """
+        return DEVICE_CLASS_MOTION
+
+    @property
+    def is_on(self):
+        """ Return true if motion was detected within the off delay. """
+        return self._is_on
+
+    @property
+    def device_state_attributes(self):
+        """ Return the state attributes. """
+        attributes = super().device_state_attributes
+        if self._detection is None:
+            return attributes
+
+        details = self._detection.details
+        attributes[ATTR_LAST_DETECTION] = self._detection.time.isoformat()
+        attributes[ATTR_REASON] = details.get("reason")
+        attributes[ATTR_PLUGIN] = details.get("plug")
+        attributes[ATTR_CONFIDENCE] = details.get("confidence")
+        objects = [
+            matrix.get("tag")
+            for matrix in details.get("matrices") or ()
+            if isinstance(matrix, dict) and matrix.get("tag")
+        ]
+        if objects:
+            attributes[ATTR_OBJECTS] = objects
+        return attributes
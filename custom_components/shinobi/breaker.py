@@ -0,0 +1,208 @@
+"""Circuit breakers for unreachable Shinobi hosts and monitors."""
+import logging
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+
+_LOGGER = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD = 3
+BACKOFF_MIN = 5
+BACKOFF_MAX = 300
+
+
+class CircuitBreaker:
+    """ Fail fast after repeated failures, probing recovery with backoff.
+
+    Once FAILURE_THRESHOLD consecutive failures were recorded the breaker
+    opens and allow() refuses requests. After the backoff a single request
+    is let through as a probe, either by a caller or by the probe coroutine,
+    and the backoff doubles every time that probe fails.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        name: str,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        """ Initialize a closed breaker. """
+        self._hass = hass
+        self.name = name
+        self._on_change = on_change
+        self.probe: Optional[Callable[[], Awaitable[Any]]] = None
+        self._failures = 0
+        self._open = False
+        self._probing = False
+        self._backoff = BACKOFF_MIN
+        self._retry_at = 0.0
+        self._cancel_retry: Optional[CALLBACK_TYPE] = None
+
+    @property
+    def closed(self) -> bool:
+        """ Return True while requests go through normally. """
+        return not self._open
+
+    def allow(self) -> bool:
+        """ Return True if a request may be made now. """
+        if not self._open:
+            return True
+        if self._probing or monotonic() < self._retry_at:
+            return False
+        self._probing = True
+        return True
+
+    @callback
+    def record_success(self):
+        """ Record a successful request, closing the breaker. """
+        self._failures = 0
+        self._probing = False
+        if not self._open:
+            return
+        _LOGGER.info("%s recovered", self.name)
+        self._open = False
+        self._backoff = BACKOFF_MIN
+        self._cancel()
+        self._changed()
+
+    @callback
+    def record_failure(self):
+        """ Record a failed request, opening the breaker when needed. """
+        self._failures += 1
+        if self._open:
+            if self._probing:
+                self._probing = False
+                self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+                self._schedule_retry()
+            return
+        if self._failures >= FAILURE_THRESHOLD:
+            _LOGGER.warning(
+                "%s failed %d times, failing fast for %ss",
+                self.name,
+                self._failures,
+                self._backoff,
+            )
+            self._open = True
+            self._schedule_retry()
+            self._changed()
+
+    @callback
+    def record_inconclusive(self):
+        """ Record a request that could not tell, e.g. for lack of local capacity.
+
+        Neither counts as a failure nor closes the breaker, but a probe that
+        ended this way is retried after the current backoff.
+        """
+        if self._probing:
+            self._probing = False
+            self._schedule_retry()
+
+    def _schedule_retry(self):
+        self._retry_at = monotonic() + self._backoff
+        self._cancel()
+        if self.probe is not None:
+            self._cancel_retry = async_call_later(
+                self._hass, self._backoff, self._async_retry
+            )
+
+    async def _async_retry(self, _now):
+        self._cancel_retry = None
+        if not self._open or self.probe is None:
+            return
+        self._retry_at = min(self._retry_at, monotonic())
+        await self.probe()
+        if self._open and not self._probing and self._cancel_retry is None:
+            # the probe never asked allow(), try again later
+            self._schedule_retry()
+
+    def _cancel(self):
+        if self._cancel_retry is not None:
+            self._cancel_retry()
+            self._cancel_retry = None
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
+
+    @callback
+    def async_stop(self):
+        """ Cancel a scheduled probe. """
+        self.probe = None
+        self._cancel()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "closed": self.closed,
+            "failures": self._failures,
+            "backoff": self._backoff if self._open else None,
+        }
+
+
+class EntryBreakers:
+    """ The breaker of an entry's NVR host and one per monitor. """
+
+    def __init__(self, hass: HomeAssistantType, host: str):
+        """ Initialize closed breakers. """
+        self._hass = hass
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self.host = CircuitBreaker(hass, f"Shinobi host {host}", self._notify_all)
+        self._monitors: Dict[str, CircuitBreaker] = {}
+
+    def monitor(self, monitor_id: str) -> CircuitBreaker:
+        """ Return the breaker of a monitor, creating it on first use. """
+        breaker = self._monitors.get(monitor_id)
+        if breaker is None:
+            breaker = self._monitors[monitor_id] = CircuitBreaker(
+                self._hass,
+                f"Shinobi monitor {monitor_id}",
+                lambda: self._notify(monitor_id),
+            )
+        return breaker
+
+    def closed(self, monitor_id: str) -> bool:
+        """ Return True if neither the host nor the monitor breaker is open. """
+        return self.host.closed and self.monitor(monitor_id).closed
+
+    @callback
+    def async_subscribe(
+        self, monitor_id: str, update_callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """ Call update_callback when a breaker of the monitor changes state. """
+        self._listeners.setdefault(monitor_id, []).append(update_callback)
+
+        @callback
+        def remove():
+            listeners = self._listeners.get(monitor_id, [])
+            if update_callback in listeners:
+                listeners.remove(update_callback)
+
+        return remove
+
+    def _notify(self, monitor_id: str):
+        for update_callback in list(self._listeners.get(monitor_id, ())):
+            update_callback()
+
+    def _notify_all(self):
+        for monitor_id in list(self._listeners):
+            self._notify(monitor_id)
+
+    @callback
+    def async_stop(self):
+        """ Cancel every scheduled probe. """
+        self.host.async_stop()
+        for breaker in self._monitors.values():
+            breaker.async_stop()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "host": self.host.as_dict(),
+            "monitors": {
+                monitor_id: breaker.as_dict()
+                for monitor_id, breaker in self._monitors.items()
+            },
+        }
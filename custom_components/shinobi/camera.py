@@ -2,19 +2,15 @@
 
 import asyncio
 import aiohttp
+from aiohttp import web
 import async_timeout
-from homeassistant.helpers.aiohttp_client import (
-    async_aiohttp_proxy_web,
-    async_aiohttp_proxy_stream,
-    async_get_clientsession,
-)
 from pyshinobicctvapi.monitors import Monitor
 from . import ATTRIBUTION
 from homeassistant.const import ATTR_ATTRIBUTION
-from .entity import EntityMixin as ShinobiEntityMixin
+from .entity import EntityMixin as ShinobiEntityMixin, async_add_monitor_entities
 import logging
+from time import monotonic, perf_counter
 
-from haffmpeg.camera import CameraMjpeg
 from haffmpeg.tools import IMAGE_JPEG, ImageFrame
 
 from homeassistant.components.camera import (
@@ -25,10 +21,50 @@ from homeassistant.components.camera import (
 )
 from homeassistant.components.ffmpeg import CONF_EXTRA_ARGUMENTS, DATA_FFMPEG
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
 from homeassistant.helpers.typing import HomeAssistantType
-from .const import DOMAIN, CAMERA_WEB_SESSION_TIMEOUT
+from .const import (
+    ATTR_STATUS,
+    DOMAIN,
+    CAMERA_WEB_SESSION_TIMEOUT,
+    CONF_FRAME_GRABBER,
+    CONF_FRAME_GRABBER_IDLE,
+    CONF_SNAPSHOT_TTL,
+    DATA_FFMPEG_SCHEDULER,
+    DATA_SNAPSHOT_CACHE,
+    DEFAULT_FRAME_GRABBER,
+    DEFAULT_FRAME_GRABBER_FPS,
+    DEFAULT_FRAME_GRABBER_IDLE,
+    DEFAULT_SNAPSHOT_TTL,
+    DEFAULT_TRANSCODE_GRACE_PERIOD,
+    MAX_SNAPSHOT_SIZE,
+)
 
-from pyshinobicctvapi import Client as ShinobiClient
+from .breaker import CircuitBreaker, EntryBreakers
+from .endpoints import EndpointPool
+from .grabber import FrameGrabber
+from .hls import is_hls_url
+from .mjpeg import FFmpegMjpegHub, HttpMjpegHub, async_read_frame
+from .probe import StreamProber, pick_stream
+from .metrics import (
+    OP_CAMERA_IMAGE,
+    OP_FFMPEG_STILL,
+    OP_FRAME_GRABBER,
+    OP_JPEG_API,
+    OP_MJPEG_FRAME,
+    OP_RESIZE,
+    MonitorMetrics,
+)
+from .resize import SIZE_BUCKETS, scale_jpeg, size_bucket
+from .scheduler import PRIORITY_STILL, FFmpegScheduler, NoSlotAvailable
+from .snapshot import SnapshotCache
+from .still import (
+    SOURCE_FFMPEG,
+    SOURCE_JPEG_API,
+    SOURCE_MJPEG_FRAME,
+    StillStrategy,
+)
+from .util import async_read_body
 from pyshinobicctvapi.const import STREAM_MJPEG
 
 _LOGGER = logging.getLogger(__name__)
@@ -39,14 +75,22 @@ async def async_setup_entry(
 ) -> None:
     """Add cameras for Shinobi"""
 
-    client: ShinobiClient = hass.data[DOMAIN][entry.entry_id]["client"]
-    monitors = await client.monitors.async_started()
-
-    cams = []
-    for monitor in monitors:
-        cams.append(ShinobiCamera(entry.entry_id, monitor))
+    started = monotonic()
+    info = hass.data[DOMAIN][entry.entry_id]
 
-    async_add_entities(cams)
+    # entities come straight from the coordinator's bulk listing
+    added = async_add_monitor_entities(
+        hass,
+        entry,
+        async_add_entities,
+        lambda monitor: [ShinobiCamera(entry.entry_id, monitor)],
+    )
+    _LOGGER.debug(
+        "Added %d cameras in %.2fs (%.2fs since entry setup)",
+        added,
+        monotonic() - started,
+        monotonic() - info["setup_started"],
+    )
 
 
 class ShinobiCamera(ShinobiEntityMixin[Monitor], Camera):
@@ -54,27 +98,187 @@ class ShinobiCamera(ShinobiEntityMixin[Monitor], Camera):
 
     def __init__(self, config_entry_id, monitor: Monitor):
         """ Initialize a Shinobi Camera """
-        super(ShinobiCamera, self).__init__(config_entry_id, monitor, "monitors")
-        self._name = monitor.name
-        self._content_type = monitor.type or DEFAULT_CONTENT_TYPE
-        self._supported_features = 0
+        super(ShinobiCamera, self).__init__(config_entry_id, monitor)
+        self._frame_grabber = None
+        self._mjpeg_hub = None
+        self._mjpeg_hub_url = None
+        self._transcode_hub = None
+        self.still_strategy = StillStrategy()
+        self._probed_urls = frozenset()
+        self.last_viewed = 0.0
+        self._status = None
+        self._handle_device_update()
         _LOGGER.debug("Initialized: %s" % monitor)
 
     async def async_added_to_hass(self):
         """ Register callbacks. """
         await super().async_added_to_hass()
-        self._still_image_url = self._device.snapshot
-        if STREAM_MJPEG in self._device.streams:
-            self._stream_mjpeg_source = next(iter(self._device.streams[STREAM_MJPEG]))
+        self.shinobi_objects["cameras"][self._device.id] = self
+        self._remove_listeners.append(
+            self._breakers.async_subscribe(
+                self._device.id, self._handle_breaker_update
+            )
+        )
+        self._breaker.probe = self.async_refresh_snapshot
+        # enrichment must not hold up adding the remaining entities
+        self.hass.async_create_task(self._async_enrich())
+
+    async def _async_enrich(self):
+        """ Run per-monitor enrichment, capped across the entry's cameras. """
+        async with self.shinobi_objects["enrich_limit"]:
+            started = monotonic()
+            await self.async_enrich()
+            _LOGGER.debug("Enriched %s in %.2fs", self._name, monotonic() - started)
+
+    async def async_enrich(self):
+        """ Warm up per-monitor state after the entity was added. """
+        await self._async_probe_streams()
+        if self._still_image_url is not None:
+            # not a view, so it must not mark the camera as watched
+            await self.async_refresh_snapshot()
+
+    async def async_options_updated(self):
+        """ Apply changed options to running per-monitor state. """
+        options = self.config_entry.options
+        grabber = self._frame_grabber
+        if grabber is None:
+            return
+        if options.get(CONF_FRAME_GRABBER, DEFAULT_FRAME_GRABBER):
+            grabber.idle_timeout = options.get(
+                CONF_FRAME_GRABBER_IDLE, DEFAULT_FRAME_GRABBER_IDLE
+            )
         else:
-            self._stream_mjpeg_source = None
-        self._stream_source = next(iter(self._device.streams), None)
-        self._supported_features = SUPPORT_STREAM if self._stream_source else 0
-        self._last_image = None
+            self._frame_grabber = None
+            await grabber.async_stop()
 
     async def async_will_remove_from_hass(self):
         """ Disconnect callbacks. """
         await super().async_will_remove_from_hass()
+        self.shinobi_objects["cameras"].pop(self._device.id, None)
+        self._breaker.async_stop()
+        self._endpoints.release(self._device.id)
+        self._snapshot_cache.discard(self._snapshot_key)
+        for bucket in SIZE_BUCKETS:
+            self._snapshot_cache.discard(self._snapshot_key + (bucket,))
+        if self._frame_grabber is not None:
+            await self._frame_grabber.async_stop()
+            self._frame_grabber = None
+        if self._mjpeg_hub is not None:
+            await self._mjpeg_hub.async_close()
+            self._mjpeg_hub = None
+        if self._transcode_hub is not None:
+            await self._transcode_hub.async_close()
+            self._transcode_hub = None
+
+    @callback
+    def _handle_device_update(self):
+        """ Refresh names and stream sources from the monitor. """
+        self._name = self._device.name
+        self._content_type = self._device.type or DEFAULT_CONTENT_TYPE
+        self._still_image_url = self._device.snapshot
+        self._streams = list(self._device.streams)
+        if STREAM_MJPEG in self._device.streams:
+            self._mjpeg_streams = list(self._device.streams[STREAM_MJPEG])
+        else:
+            self._mjpeg_streams = []
+        self._select_streams()
+
+        urls = frozenset(stream.url for stream in self._streams + self._mjpeg_streams)
+        if self.hass is not None and urls != self._probed_urls:
+            self.hass.async_create_task(self._async_probe_streams())
+
+    @callback
+    def _handle_event_update(self):
+        """ Write state only when the monitor's status changed.
+
+        Detections are reported by the motion sensor, writing the camera's
+        state for each of them would only churn the recorder.
+        """
+        status = self.events.status.get(self._device.id)
+        if status != self._status:
+            self._status = status
+            self._update_callback()
+
+    @callback
+    def _select_streams(self):
+        """ Pick the streams to use from the latest probe results. """
+        if self.hass is None:
+            # not added yet, keep the advertised order until probed
+            self._stream_source = next(iter(self._streams), None)
+            self._dashboard_source = self._stream_source
+            self._stream_mjpeg_source = next(iter(self._mjpeg_streams), None)
+        else:
+            self._stream_source = pick_stream(self._streams, self._prober)
+            self._dashboard_source = pick_stream(
+                self._streams, self._prober, low_bitrate=True
+            )
+            self._stream_mjpeg_source = pick_stream(
+                self._mjpeg_streams, self._prober, low_bitrate=True
+            )
+        self._supported_features = SUPPORT_STREAM if self._stream_source else 0
+        self.still_strategy.update_sources(
+            source
+            for source, available in (
+                (SOURCE_JPEG_API, self._still_image_url),
+                (SOURCE_MJPEG_FRAME, self._stream_mjpeg_source),
+                (SOURCE_FFMPEG, self._dashboard_source),
+            )
+            if available is not None
+        )
+
+    async def _async_probe_streams(self):
+        """ Probe every advertised stream concurrently and reselect. """
+        streams = self._streams + self._mjpeg_streams
+        self._probed_urls = frozenset(stream.url for stream in streams)
+        probes = await self._prober.async_probe_all(self._probed_urls)
+        # urls skipped for lack of ffmpeg capacity get another go on the next update
+        self._probed_urls = frozenset(probe.url for probe in probes)
+        self._select_streams()
+        _LOGGER.debug(
+            "Selected streams for %s: %s (high quality), %s (dashboard)",
+            self._name,
+            self._stream_source.url if self._stream_source else None,
+            self._dashboard_source.url if self._dashboard_source else None,
+        )
+
+    @property
+    def hls_source_url(self):
+        """ Return the url of the monitor's own HLS playlist, if it has one. """
+        return next(
+            (stream.url for stream in self._streams if is_hls_url(stream.url)), None
+        )
+
+    @property
+    def stream_diagnostics(self):
+        """ Return the probe results of the monitor's streams, without urls. """
+        roles = {
+            "high_quality": self._stream_source,
+            "dashboard": self._dashboard_source,
+            "mjpeg": self._stream_mjpeg_source,
+        }
+        diagnostics = []
+        for stream in self._streams + self._mjpeg_streams:
+            probe = self._prober.get(stream.url)
+            entry = probe._asdict() if probe is not None else {"reachable": None}
+            entry.pop("url", None)
+            entry["roles"] = [
+                role for role, chosen in roles.items() if chosen is stream
+            ]
+            diagnostics.append(entry)
+        return diagnostics
+
+    @callback
+    def _handle_breaker_update(self):
+        """ Write state when a circuit breaker flips availability. """
+        available = self.available
+        if available != self._was_available:
+            self._was_available = available
+            self._update_callback()
+
+    @property
+    def available(self):
+        """ Return False while the monitor or its host is failing fast. """
+        return super().available and self._breakers.closed(self._device.id)
 
     @property
     def name(self):
@@ -86,106 +290,348 @@ class ShinobiCamera(ShinobiEntityMixin[Monitor], Camera):
         """Return supported features for this camera."""
         return self._supported_features
 
+    @property
+    def is_recording(self):
+        """ Return true if the monitor reports it is recording. """
+        return (self.events.status.get(self._device.id) or "").lower() == "recording"
+
+    @property
+    def device_state_attributes(self):
+        """ Return the state attributes. """
+        attributes = super().device_state_attributes
+        status = self.events.status.get(self._device.id)
+        if status is not None:
+            attributes[ATTR_STATUS] = status
+        return attributes
+
     @property
     def unique_id(self):
         """ Return as unique id. """
         return self._device.id
 
-    def camera_image(self):
+    def camera_image(self, width=None, height=None):
         """Return bytes of camera image."""
         return asyncio.run_coroutine_threadsafe(
-            self.async_camera_image(), self.hass.loop
+            self.async_camera_image(width, height), self.hass.loop
         ).result()
 
     async def async_create_still_from_stream(self):
-        """ Generate a still image from camera stream using FFMPEG """
+        """ Generate a still image from camera stream using FFMPEG
+
+        Raises NoSlotAvailable when the host has no ffmpeg capacity left.
+        """
 
         ffmpeg_manager = self.hass.data[DATA_FFMPEG]
 
         ffmpeg = ImageFrame(ffmpeg_manager.binary)
 
-        if self._stream_source is None:
+        if self._dashboard_source is None:
             return
 
-        if self._stream_mjpeg_source is not None:
-            stream_url = self._stream_mjpeg_source.url
-        else:
-            stream_url = self._stream_source.url
+        # MJPEG frames are read without ffmpeg, see _async_fetch_mjpeg_frame
+        stream_url = self._node_url(self._dashboard_source.url)
 
-        image = await asyncio.shield(
-            ffmpeg.get_image(stream_url, output_format=IMAGE_JPEG)
-        )
+        options = self.config_entry.options
+        if options.get(CONF_FRAME_GRABBER, DEFAULT_FRAME_GRABBER):
+            return await self._async_grab_frame(
+                ffmpeg_manager.binary,
+                stream_url,
+                options.get(CONF_FRAME_GRABBER_IDLE, DEFAULT_FRAME_GRABBER_IDLE),
+            )
+
+        with self._metrics.operation(OP_FFMPEG_STILL).measure() as stats:
+            image = await self._ffmpeg_scheduler.async_run(
+                PRIORITY_STILL,
+                lambda: ffmpeg.get_image(stream_url, output_format=IMAGE_JPEG),
+                key=("still", stream_url),
+                timeout=CAMERA_WEB_SESSION_TIMEOUT,
+            )
+            if image is None:
+                stats.errors += 1
         return image
 
-    async def async_camera_image(self):
+    async def _async_grab_frame(self, ffmpeg_bin, stream_url, idle_timeout):
+        """ Return the latest frame of a long-lived ffmpeg grabber. """
+        grabber = self._frame_grabber
+        if grabber is None or grabber.url != stream_url:
+            if grabber is not None:
+                await grabber.async_stop()
+            grabber = self._frame_grabber = FrameGrabber(
+                self.hass,
+                ffmpeg_bin,
+                self._ffmpeg_scheduler,
+                stream_url,
+                DEFAULT_FRAME_GRABBER_FPS,
+                idle_timeout,
+            )
+        grabber.idle_timeout = idle_timeout
+        with self._metrics.operation(OP_FRAME_GRABBER).measure() as stats:
+            image = await grabber.async_get_image(CAMERA_WEB_SESSION_TIMEOUT)
+            if image is None:
+                stats.errors += 1
+        return image
+
+    async def async_camera_image(self, width=None, height=None):
         """Return a still image response from the camera."""
         _LOGGER.debug("Take snapshot from %s", self._name)
 
-        url = self._still_image_url
+        self.last_viewed = monotonic()
+        ttl = self.config_entry.options.get(CONF_SNAPSHOT_TTL, DEFAULT_SNAPSHOT_TTL)
+        prefetcher = self.shinobi_objects["prefetcher"]
+        if prefetcher.running:
+            # prefetched frames stay valid until the next couple of rounds
+            ttl = max(ttl, 2 * prefetcher.interval)
+        with self._metrics.operation(OP_CAMERA_IMAGE).measure():
+            image = await self._snapshot_cache.async_get(
+                self._snapshot_key, ttl, self._async_fetch_image
+            )
+            bucket = size_bucket(width, height)
+            if image is not None and bucket is not None:
+                image = await self._async_scaled_image(image, bucket, ttl)
+        if image is not None:
+            self._metrics.bytes_served += len(image)
+        return image
+
+    async def _async_scaled_image(self, image, bucket, ttl):
+        """ Return the image scaled to a size bucket, cached per bucket.
+
+        A scaled copy is only reused while it is newer than the full size
+        image, which the prefetcher refreshes under the same ttl.
+        """
+
+        async def scale():
+            try:
+                with self._metrics.operation(OP_RESIZE).measure():
+                    return await self.hass.async_add_executor_job(
+                        scale_jpeg, image, bucket
+                    )
+            except OSError as err:
+                _LOGGER.debug("Unable to scale image from %s: %s", self._name, err)
+                return None
+
+        scaled = await self._snapshot_cache.async_get(
+            self._snapshot_key + (bucket,),
+            ttl,
+            scale,
+            not_before=self._snapshot_cache.fetched_at(self._snapshot_key),
+        )
+        return scaled or image
+
+    async def async_refresh_snapshot(self):
+        """ Fetch a new snapshot into the cache, returning None on failure. """
+        return await self._snapshot_cache.async_refresh(
+            self._snapshot_key, self._async_fetch_image
+        )
+
+    async def _async_fetch_image(self):
+        """ Fetch a new still image from the cheapest healthy source.
+
+        Sources are tried in the order the still strategy ranks them, falling
+        over to the next one when a source fails. A source skipped for lack
+        of local ffmpeg capacity says nothing about the monitor, so it counts
+        against neither the source nor the breaker.
+        """
+        breaker = self._breaker
+        if not self._breakers.host.closed or not breaker.allow():
+            # the snapshot cache falls back to the last image it holds
+            _LOGGER.debug("Circuit open for %s, not fetching a still", self._name)
+            return None
+
+        fetchers = {
+            SOURCE_JPEG_API: self._async_fetch_jpeg_api,
+            SOURCE_MJPEG_FRAME: self._async_fetch_mjpeg_frame,
+            SOURCE_FFMPEG: self.async_create_still_from_stream,
+        }
+        failed = False
+        for source in self.still_strategy.candidates():
+            started = perf_counter()
+            try:
+                image = await fetchers[source]()
+            except NoSlotAvailable:
+                _LOGGER.warning("No ffmpeg slot free for a still from %s", self._name)
+                continue
+            self.still_strategy.record(source, perf_counter() - started, bool(image))
+            if image:
+                breaker.record_success()
+                return image
+            failed = True
+            _LOGGER.debug("Still from %s failed for %s", source, self._name)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_inconclusive()
+        return None
+
+    async def _async_fetch_jpeg_api(self):
+        """ Fetch a still image from the monitor's JPEG API. """
+        websession = self.shinobi_objects["sessions"].api
+        endpoints = self._endpoints
 
-        if url is None:
-            _LOGGER.debug("JPEG API not available, pulling still from stream")
-            return await self.async_create_still_from_stream()
+        async def fetch(endpoint):
+            url = endpoints.rebase(self._still_image_url, endpoint)
+            with async_timeout.timeout(CAMERA_WEB_SESSION_TIMEOUT):
+                async with websession.get(url) as response:
+                    response.raise_for_status()
+                    return await async_read_body(response, MAX_SNAPSHOT_SIZE)
 
         try:
-            websession = async_get_clientsession(self.hass)
-            with async_timeout.timeout(10):
-                response = await websession.get(url)
-            self._last_image = await response.read()
+            with self._metrics.operation(OP_JPEG_API).measure():
+                return await endpoints.async_request(fetch)
         except asyncio.TimeoutError:
-            _LOGGER.error("Timeout getting camera image from %s", self._name)
-            return self._last_image
+            _LOGGER.warning("Timeout getting camera image from %s", self._name)
         except aiohttp.ClientError as err:
-            _LOGGER.error("Error getting new camera image from %s: %s", self._name, err)
-            return self._last_image
+            _LOGGER.warning("Error getting camera image from %s: %s", self._name, err)
+        return None
+
+    async def _async_fetch_mjpeg_frame(self):
+        """ Return a frame of the monitor's native MJPEG stream. """
+        ttl = self.config_entry.options.get(CONF_SNAPSHOT_TTL, DEFAULT_SNAPSHOT_TTL)
+        hub = self._mjpeg_hub
+        if (
+            hub is not None
+            and hub.viewers
+            and hub.latest_frame is not None
+            and monotonic() - hub.latest_frame_at <= ttl
+        ):
+            # someone is watching already, reuse their stream
+            return hub.latest_frame
+
+        websession = self.shinobi_objects["sessions"].stream
+        endpoints = self._endpoints
+
+        async def fetch(endpoint):
+            url = endpoints.rebase(self._stream_mjpeg_source.url, endpoint)
+            with async_timeout.timeout(CAMERA_WEB_SESSION_TIMEOUT):
+                async with websession.get(url) as response:
+                    response.raise_for_status()
+                    return await async_read_frame(response)
 
-        return self._last_image
+        try:
+            with self._metrics.operation(OP_MJPEG_FRAME).measure():
+                return await endpoints.async_request(fetch)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Timeout reading MJPEG frame from %s", self._name)
+        except aiohttp.ClientError as err:
+            _LOGGER.warning("Error reading MJPEG frame from %s: %s", self._name, err)
+        return None
+
+    @property
+    def _metrics(self) -> MonitorMetrics:
+        return self.shinobi_objects["metrics"].monitor(self._device.id)
+
+    @property
+    def _breakers(self) -> EntryBreakers:
+        return self.shinobi_objects["breakers"]
+
+    @property
+    def _breaker(self) -> CircuitBreaker:
+        return self._breakers.monitor(self._device.id)
+
+    @property
+    def _endpoints(self) -> EndpointPool:
+        return self.shinobi_objects["endpoints"]
+
+    def _node_url(self, url: str) -> str:
+        """ Return url on the node assigned to the monitor's streams. """
+        return self._endpoints.rebase(url, self._endpoints.assign(self._device.id))
+
+    @property
+    def _ffmpeg_scheduler(self) -> FFmpegScheduler:
+        return self.hass.data[DATA_FFMPEG_SCHEDULER]
+
+    @property
+    def _prober(self) -> StreamProber:
+        return self.shinobi_objects["prober"]
+
+    @property
+    def _snapshot_cache(self) -> SnapshotCache:
+        return self.hass.data[DATA_SNAPSHOT_CACHE]
+
+    @property
+    def _snapshot_key(self):
+        return (self._config_entry_id, self._device.id)
 
     async def stream_source(self):
         """Return the source of the stream."""
         if self._stream_source is None:
             return None
 
-        return self._stream_source.url
+        return self._node_url(self._stream_source.url)
 
     async def async_create_mjpeg_from_stream(self, request):
         """ Create MJPEG from string"""
 
-        _LOGGER.debug(
-            "converting source stream to mjpeg for replay from %s", self._name
-        )
         ffmpeg_manager = self.hass.data[DATA_FFMPEG]
-
-        streaming_url = self._stream_source.url
-        stream = CameraMjpeg(ffmpeg_manager.binary)
-        await stream.open_camera(streaming_url)  # , extra_cmd=self._ffmpeg_arguments)
-
-        try:
-            stream_reader = await stream.get_reader()
-            return await async_aiohttp_proxy_stream(
+        # moving the monitor to another node replaces the hub
+        streaming_url = self._node_url(self._dashboard_source.url)
+
+        hub = self._transcode_hub
+        if hub is None or hub.url != streaming_url:
+            if hub is not None:
+                self.hass.async_create_task(hub.async_close())
+            hub = self._transcode_hub = FFmpegMjpegHub(
                 self.hass,
-                request,
-                stream_reader,
-                ffmpeg_manager.ffmpeg_stream_content_type,
+                self._name,
+                ffmpeg_manager.binary,
+                self._ffmpeg_scheduler,
+                streaming_url,
+                DEFAULT_TRANSCODE_GRACE_PERIOD,
+                self._metrics,
             )
-        finally:
-            _LOGGER.debug("Closing MJPEG stream from %s" % self._name)
-            await stream.close()
+
+        return await hub.async_handle(request)
 
     async def handle_async_mjpeg_stream(self, request):
         """Return an MJPEG stream."""
+        self.last_viewed = monotonic()
+        if not self._breakers.closed(self._device.id):
+            raise web.HTTPServiceUnavailable()
+
         if self._stream_source is None:
             _LOGGER.debug("No source stream falling back to mjpeg snapshots")
             return await super().handle_async_mjpeg_stream(request)
 
         if self._stream_mjpeg_source is not None:
             _LOGGER.debug("Sending MJPEG stream provided by monitor")
-            websession = async_get_clientsession(self.hass)
-            streaming_url = self._stream_mjpeg_source.url
-            stream_coro = websession.get(
-                streaming_url, timeout=CAMERA_WEB_SESSION_TIMEOUT
+            return await self._async_get_mjpeg_hub().async_handle(request)
+
+        return await self.async_create_mjpeg_from_stream(request)
+
+    def _async_get_mjpeg_hub(self) -> HttpMjpegHub:
+        """ Return the hub sharing the monitor's MJPEG stream between viewers. """
+        endpoint = self._endpoints.assign(self._device.id)
+        streaming_url = self._endpoints.rebase(self._stream_mjpeg_source.url, endpoint)
+        if self._mjpeg_hub is None or self._mjpeg_hub_url != streaming_url:
+            if self._mjpeg_hub is not None:
+                self.hass.async_create_task(self._mjpeg_hub.async_close())
+            websession = self.shinobi_objects["sessions"].stream
+            breaker = self._breaker
+
+            async def open_upstream():
+                try:
+                    response = await websession.get(
+                        streaming_url,
+                        timeout=aiohttp.ClientTimeout(
+                            sock_connect=CAMERA_WEB_SESSION_TIMEOUT,
+                            sock_read=CAMERA_WEB_SESSION_TIMEOUT,
+                        ),
+                    )
+                except (asyncio.TimeoutError, aiohttp.ClientError):
+                    breaker.record_failure()
+                    endpoint.breaker.record_failure()
+                    raise
+                if response.status < 400:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                if response.status < 500:
+                    endpoint.breaker.record_success()
+                else:
+                    endpoint.breaker.record_failure()
+                return response
+
+            self._mjpeg_hub_url = streaming_url
+            self._mjpeg_hub = HttpMjpegHub(
+                self.hass, self._name, open_upstream, self._metrics
             )
-
-            return await async_aiohttp_proxy_web(self.hass, request, stream_coro)
-
-        return await self.async_create_mjpeg_from_stream(request)
\ No newline at end of file
+        return self._mjpeg_hub
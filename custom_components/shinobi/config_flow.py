@@ -1,5 +1,6 @@
 """Config flow to configure Shinobi Integration."""
 from enum import unique
+import ipaddress
 import logging
 from typing import Dict, Any, Optional
 
@@ -16,19 +17,45 @@ from homeassistant.const import (
 )
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
+from homeassistant.util import get_local_ip
 from aiohttp import ClientResponseError
 
 from .const import (
+    CONF_API_CONNECTIONS,
+    CONF_ENDPOINTS,
+    CONF_FRAME_GRABBER,
+    CONF_FRAME_GRABBER_IDLE,
     CONF_GROUP,
+    CONF_HLS_PASSTHROUGH,
+    CONF_MOTION_OFF_DELAY,
+    CONF_PORTS,
+    CONF_PREFETCH,
+    CONF_SERVER,
+    CONF_SNAPSHOT_TTL,
+    CONF_STREAM_CONNECTIONS,
+    CONF_SUBNETS,
     CONF_TOKEN,
     DEFAULT_USERNAME,
     DOMAIN,
+    DEFAULT_API_CONNECTIONS,
+    DEFAULT_DISCOVERY_PORTS,
+    DEFAULT_FRAME_GRABBER,
+    DEFAULT_FRAME_GRABBER_IDLE,
+    DEFAULT_HLS_PASSTHROUGH,
+    DEFAULT_MOTION_OFF_DELAY,
+    DEFAULT_PREFETCH,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SNAPSHOT_TTL,
+    DEFAULT_STREAM_CONNECTIONS,
 )
 
+from .discovery import async_discover, parse_ports, parse_subnets
+from .endpoints import parse_endpoints
+
 from datetime import datetime
 
 from pyshinobicctvapi import Connection as ShinobiConnection
@@ -42,6 +69,8 @@ from pyshinobicctvapi.api import (
 
 _LOGGER = logging.getLogger(__name__)
 
+MANUAL_ENTRY = "manual"
+
 
 async def validate_input(hass: HomeAssistantType, data: dict) -> Dict[str, Any]:
     """Validate the user input allows us to connect.
@@ -95,18 +124,23 @@ class ShinobiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
-    # @staticmethod
-    # @callback
-    # def async_get_options_flow(config_entry):
-    #    """Get the options flow for this handler."""
-    #    return OptionsFlowHandler(config_entry)
+    def __init__(self):
+        """Initialize the flow."""
+        self._discovered = {}
+        self._defaults = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
 
     async def async_step_user(
         self, user_input: Optional[ConfigType] = None
     ) -> Dict[str, Any]:
         """Handle a flow initiated by the user."""
         if user_input is None:
-            return self._show_user_form()
+            return self._show_discover_form()
 
         if CONF_TOKEN not in user_input or CONF_GROUP not in user_input:
             self._user_input = user_input
@@ -139,6 +173,59 @@ class ShinobiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         _LOGGER.debug("created: %s " % user_input)
         return self.async_create_entry(title="Shinobi CCTV", data=user_input)
 
+    async def async_step_discover(
+        self, user_input: Optional[ConfigType] = None
+    ) -> Dict[str, Any]:
+        """Scan the local network for Shinobi servers."""
+        if user_input is None:
+            return self._show_discover_form()
+
+        if not user_input.get(CONF_SUBNETS, "").strip():
+            return self._show_user_form()
+
+        try:
+            subnets = parse_subnets(user_input[CONF_SUBNETS])
+        except ValueError:
+            return self._show_discover_form({CONF_SUBNETS: "invalid_subnet"})
+        try:
+            ports = parse_ports(user_input.get(CONF_PORTS, DEFAULT_DISCOVERY_PORTS))
+        except ValueError:
+            return self._show_discover_form({CONF_PORTS: "invalid_port"})
+
+        servers = await async_discover(
+            async_get_clientsession(self.hass), subnets, ports, self._configured()
+        )
+        if not servers:
+            return self._show_user_form({"base": "no_servers_found"})
+
+        self._discovered = {server.key: server for server in servers}
+        return self._show_pick_form()
+
+    async def async_step_pick(
+        self, user_input: Optional[ConfigType] = None
+    ) -> Dict[str, Any]:
+        """Let the user pick one of the discovered servers."""
+        if user_input is None:
+            return self._show_pick_form()
+
+        server = self._discovered.get(user_input[CONF_SERVER])
+        if server is not None:
+            self._defaults = {CONF_HOST: server.host, CONF_PORT: server.port}
+        return self._show_user_form()
+
+    def _configured(self):
+        """Return the host and port of every existing entry."""
+        configured = set()
+        for unique_id in self._async_current_ids():
+            host, _, _group = (unique_id or "").rpartition(":")
+            host, _, port = host.rpartition(":")
+            if port.isdigit():
+                configured.add((host, int(port)))
+        for entry in self._async_current_entries():
+            if entry.data.get(CONF_PORT):
+                configured.add((entry.data[CONF_HOST], entry.data[CONF_PORT]))
+        return configured
+
     async def async_step_login(
         self, user_input: Optional[ConfigType] = None
     ) -> Dict[str, Any]:
@@ -168,13 +255,44 @@ class ShinobiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is None:
             return self._show_2fa_form()
 
+    def _show_discover_form(self, errors: Optional[dict] = None):
+        """ Ask which subnets and ports to scan. """
+        try:
+            subnet = str(ipaddress.ip_network(f"{get_local_ip()}/24", strict=False))
+        except ValueError:
+            subnet = ""
+
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_SUBNETS, default=subnet): str,
+                    vol.Optional(CONF_PORTS, default=DEFAULT_DISCOVERY_PORTS): str,
+                }
+            ),
+            errors=errors or {},
+        )
+
+    def _show_pick_form(self, errors: Optional[dict] = None):
+        """ Offer the discovered servers as a pick list. """
+        choices = {key: key for key in self._discovered}
+        choices[MANUAL_ENTRY] = "Enter manually"
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema({vol.Required(CONF_SERVER): vol.In(choices)}),
+            errors=errors or {},
+        )
+
     def _show_user_form(self, errors: Optional[dict] = None):
+        # prefilled with the server picked from discovery, if any
+        defaults = {key: {"default": value} for key, value in self._defaults.items()}
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_HOST): str,
-                    vol.Optional(CONF_PORT): int,
+                    vol.Required(CONF_HOST, **defaults.get(CONF_HOST, {})): str,
+                    vol.Optional(CONF_PORT, **defaults.get(CONF_PORT, {})): int,
                     vol.Optional(CONF_TOKEN): str,
                     vol.Optional(CONF_GROUP): str,
                     vol.Optional(
@@ -218,11 +336,18 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):
         """Manage the options."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                parse_endpoints(user_input.get(CONF_ENDPOINTS, ""))
+            except ValueError:
+                errors[CONF_ENDPOINTS] = "invalid_endpoints"
+            else:
+                return self.async_create_entry(title="", data=user_input)
 
         return self.async_show_form(
             step_id="init",
+            errors=errors,
             data_schema=vol.Schema(
                 {
                     # vol.Optional(
@@ -237,6 +362,58 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
                         ),
                     ): vol.All(vol.Coerce(int), vol.Range(min=5, max=60)),
+                    vol.Optional(
+                        CONF_SNAPSHOT_TTL,
+                        default=self.config_entry.options.get(
+                            CONF_SNAPSHOT_TTL, DEFAULT_SNAPSHOT_TTL
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_FRAME_GRABBER,
+                        default=self.config_entry.options.get(
+                            CONF_FRAME_GRABBER, DEFAULT_FRAME_GRABBER
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_FRAME_GRABBER_IDLE,
+                        default=self.config_entry.options.get(
+                            CONF_FRAME_GRABBER_IDLE, DEFAULT_FRAME_GRABBER_IDLE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                    vol.Optional(
+                        CONF_MOTION_OFF_DELAY,
+                        default=self.config_entry.options.get(
+                            CONF_MOTION_OFF_DELAY, DEFAULT_MOTION_OFF_DELAY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=600)),
+                    vol.Optional(
+                        CONF_API_CONNECTIONS,
+                        default=self.config_entry.options.get(
+                            CONF_API_CONNECTIONS, DEFAULT_API_CONNECTIONS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Optional(
+                        CONF_STREAM_CONNECTIONS,
+                        default=self.config_entry.options.get(
+                            CONF_STREAM_CONNECTIONS, DEFAULT_STREAM_CONNECTIONS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=512)),
+                    vol.Optional(
+                        CONF_PREFETCH,
+                        default=self.config_entry.options.get(
+                            CONF_PREFETCH, DEFAULT_PREFETCH
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_HLS_PASSTHROUGH,
+                        default=self.config_entry.options.get(
+                            CONF_HLS_PASSTHROUGH, DEFAULT_HLS_PASSTHROUGH
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_ENDPOINTS,
+                        default=self.config_entry.options.get(CONF_ENDPOINTS, ""),
+                    ): str,
                 }
             ),
         )
\ No newline at end of file
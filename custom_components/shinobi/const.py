@@ -5,15 +5,67 @@ from homeassistant.components.camera import DOMAIN as CAMERA_DOMAIN
 
 DOMAIN = "shinobi"
 
-SHINOBI_PLATFORMS = ["camera"]
+SHINOBI_PLATFORMS = ["binary_sensor", "camera", "sensor"]
 
 CONF_TOKEN = "api_key"
 CONF_GROUP = "group"
+CONF_SNAPSHOT_TTL = "snapshot_ttl"
+CONF_FRAME_GRABBER = "frame_grabber"
+CONF_FRAME_GRABBER_IDLE = "frame_grabber_idle"
+CONF_MOTION_OFF_DELAY = "motion_off_delay"
+CONF_API_CONNECTIONS = "api_connections"
+CONF_STREAM_CONNECTIONS = "stream_connections"
+CONF_PREFETCH = "prefetch"
+CONF_HLS_PASSTHROUGH = "hls_passthrough"
+CONF_SUBNETS = "subnets"
+CONF_PORTS = "ports"
+CONF_SERVER = "server"
+CONF_ENDPOINTS = "endpoints"
 
 DEFAULT_BRAND = "Shinobi Systems"
 DEFAULT_USERNAME = "admin@shinobi.video"
 DEFAULT_SCAN_INTERVAL = 10
+DEFAULT_SNAPSHOT_TTL = 2
+DEFAULT_SNAPSHOT_CACHE_SIZE = 32 * 1024 * 1024
+DEFAULT_FRAME_GRABBER = False
+DEFAULT_FRAME_GRABBER_FPS = 1
+DEFAULT_FRAME_GRABBER_IDLE = 60
+DEFAULT_TRANSCODE_GRACE_PERIOD = 10
+DEFAULT_MOTION_OFF_DELAY = 15
+DEFAULT_API_CONNECTIONS = 8
+DEFAULT_STREAM_CONNECTIONS = 64
+DEFAULT_DISCOVERY_PORTS = "8080"
+DEFAULT_PREFETCH = False
+DEFAULT_PREFETCH_IDLE = 5 * 60
+DEFAULT_HLS_PASSTHROUGH = False
+DEFAULT_HLS_CACHE_SIZE = 16 * 1024 * 1024
+
+ATTR_ENTRY_ID = "entry_id"
+ATTR_STATUS = "status"
+ATTR_LAST_DETECTION = "last_detection"
+ATTR_REASON = "reason"
+ATTR_PLUGIN = "plugin"
+ATTR_CONFIDENCE = "confidence"
+ATTR_OBJECTS = "objects"
+
+DATA_SNAPSHOT_CACHE = f"{DOMAIN}_snapshot_cache"
+DATA_PREFETCH_LIMIT = f"{DOMAIN}_prefetch_limit"
+DATA_FFMPEG_SCHEDULER = f"{DOMAIN}_ffmpeg_scheduler"
+DATA_HLS_CACHE = f"{DOMAIN}_hls_cache"
+DATA_SIGNING_TOKEN = f"{DOMAIN}_signing_token"
+DATA_REFRESH_LIMIT = f"{DOMAIN}_refresh_limit"
+DATA_REFRESH_HOST_LIMITS = f"{DOMAIN}_refresh_host_limits"
 
 CAMERA_WEB_SESSION_TIMEOUT = 10
+KEEPALIVE_TIMEOUT = 30
+MAX_SNAPSHOT_SIZE = 8 * 1024 * 1024
+
+SERVICE_UPDATE = "update"
+REFRESH_MAX_CONCURRENCY = 16
+REFRESH_HOST_CONCURRENCY = 4
+ENRICH_MAX_CONCURRENCY = 4
+PREFETCH_MAX_CONCURRENCY = 8
+PROBE_MAX_CONCURRENCY = 4
+STREAM_PROBE_TIMEOUT = 10
 
 LOGGER = logging.getLogger(__package__)
\ No newline at end of file
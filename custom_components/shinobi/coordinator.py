@@ -0,0 +1,113 @@
+"""Shinobi monitor update coordinator."""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+import aiohttp
+from homeassistant.helpers.typing import HomeAssistantType
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from pyshinobicctvapi import Connection as ShinobiConnection
+from pyshinobicctvapi.monitors import Monitor
+import pyshinobicctvapi.errors as ShinobiErrors
+
+from .breaker import CircuitBreaker
+from .const import DOMAIN
+from .endpoints import EndpointPool
+from .metrics import OperationStats
+
+_LOGGER = logging.getLogger(__name__)
+
+
+
+def _slots(value: Any) -> Dict[str, Any]:
+    names = (
+        name
+        for cls in type(value).__mro__
+        for name in getattr(cls, "__slots__", ())
+        if name not in ("__dict__", "__weakref__")
+    )
+    return {name: getattr(value, name) for name in names if hasattr(value, name)}
+
+
+def _fingerprint(value: Any, path: Optional[FrozenSet[int]] = None) -> Any:
+    """ Reduce a monitor to plain comparable values.
+
+    Every poll builds new objects, so nested ones are followed all the way
+    down rather than compared by identity. Objects already on the current
+    path are cut off, which keeps reference cycles from recursing forever.
+    """
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if isinstance(value, ShinobiConnection):
+        return None
+    path = path or frozenset()
+    if id(value) in path:
+        return "<cycle>"
+    path = path | {id(value)}
+    if isinstance(value, dict):
+        return {key: _fingerprint(item, path) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(item, path) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_fingerprint(item, path) for item in value), key=repr)
+    if hasattr(value, "__dict__") or hasattr(type(value), "__slots__"):
+        attributes = dict(getattr(value, "__dict__", {}), **_slots(value))
+        return [type(value).__name__, _fingerprint(attributes, path)]
+    return repr(value)
+
+
+class ShinobiMonitorCoordinator(DataUpdateCoordinator):
+    """ Fetch every monitor of a config entry in a single API call. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        endpoints: EndpointPool,
+        update_interval: timedelta,
+        api_stats: OperationStats,
+        breaker: CircuitBreaker,
+    ):
+        """ Initialize the coordinator. """
+        super().__init__(
+            hass, _LOGGER, name=DOMAIN, update_interval=update_interval
+        )
+        self._endpoints = endpoints
+        self.api_stats = api_stats
+        # polling keeps probing the host even while its breaker is open
+        self.breaker = breaker
+        self._fingerprints: Dict[str, Any] = {}
+        self.changed: Set[str] = set()
+        self.added: Set[str] = set()
+        self.removed: Set[str] = set()
+
+    async def _async_update_data(self) -> Dict[str, Monitor]:
+        """ Fetch all started monitors and note which ones changed. """
+        # a failed update keeps the previous data, it must not look like a diff
+        self.changed = set()
+        self.added = set()
+        self.removed = set()
+        try:
+            with self.api_stats.measure():
+                # sticking to one node keeps the monitors' urls from flapping
+                monitors = await self._endpoints.async_request(
+                    lambda endpoint: endpoint.client.monitors.async_started(),
+                    affinity="monitors",
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ShinobiErrors.Error) as err:
+            self.breaker.record_failure()
+            raise UpdateFailed(f"Error fetching monitors: {err}") from err
+        self.breaker.record_success()
+
+        data = {monitor.id: monitor for monitor in monitors}
+        fingerprints = {key: _fingerprint(monitor) for key, monitor in data.items()}
+        self.changed = {
+            key
+            for key, fingerprint in fingerprints.items()
+            if self._fingerprints.get(key) != fingerprint
+        }
+        if self.data is not None:
+            self.added = data.keys() - self.data.keys()
+            self.removed = self.data.keys() - data.keys()
+        self._fingerprints = fingerprints
+        return data
@@ -0,0 +1,73 @@
+"""Diagnostics support for Shinobi."""
+from typing import Any, Dict
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.typing import HomeAssistantType
+import voluptuous as vol
+
+from .const import (
+    ATTR_ENTRY_ID,
+    CONF_TOKEN,
+    DATA_FFMPEG_SCHEDULER,
+    DATA_SNAPSHOT_CACHE,
+    DOMAIN,
+)
+
+TO_REDACT = {CONF_TOKEN}
+WS_TYPE_DIAGNOSTICS = f"{DOMAIN}/diagnostics"
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistantType):
+    """ Expose the dump on HA versions without the diagnostics platform. """
+    websocket_api.async_register_command(hass, websocket_diagnostics)
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): WS_TYPE_DIAGNOSTICS, vol.Required(ATTR_ENTRY_ID): str}
+)
+@websocket_api.require_admin
+@websocket_api.async_response
+async def websocket_diagnostics(
+    hass: HomeAssistantType, connection: websocket_api.ActiveConnection, msg: dict
+):
+    """ Send the diagnostics of a loaded config entry. """
+    entry = hass.config_entries.async_get_entry(msg[ATTR_ENTRY_ID])
+    if entry is None or entry.entry_id not in hass.data.get(DOMAIN, {}):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Entry not loaded"
+        )
+        return
+    connection.send_result(
+        msg["id"], await async_get_config_entry_diagnostics(hass, entry)
+    )
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistantType, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """ Return the performance metrics of a config entry. """
+    info = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "data": {
+            key: "**REDACTED**" if key in TO_REDACT else value
+            for key, value in entry.data.items()
+        },
+        "options": dict(entry.options),
+        "event_socket_connected": info["events"].connected,
+        "snapshot_cache_bytes": hass.data[DATA_SNAPSHOT_CACHE].size,
+        "ffmpeg_scheduler": hass.data[DATA_FFMPEG_SCHEDULER].as_dict(),
+        "metrics": info["metrics"].as_dict(),
+        "breakers": info["breakers"].as_dict(),
+        "endpoints": info["endpoints"].as_dict(),
+        "streams": {
+            monitor_id: camera.stream_diagnostics
+            for monitor_id, camera in info["cameras"].items()
+        },
+        "still_sources": {
+            monitor_id: camera.still_strategy.as_dict()
+            for monitor_id, camera in info["cameras"].items()
+        },
+    }
@@ -0,0 +1,127 @@
+"""Parallel discovery of Shinobi servers on the local network."""
+import asyncio
+import ipaddress
+import logging
+from time import perf_counter
+from typing import Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_TIMEOUT = 1.5
+# the largest network scanned per subnet, bigger ones are almost always typos
+MAX_SUBNET_HOSTS = 1024
+FINGERPRINT_BYTES = 16 * 1024
+
+
+class DiscoveredServer(NamedTuple):
+    host: str
+    port: int
+    latency: float
+
+    @property
+    def key(self) -> str:
+        """ Return the host:port identifier used in the pick list. """
+        return f"{self.host}:{self.port}"
+
+
+def parse_subnets(value: str) -> List[ipaddress.IPv4Network]:
+    """ Parse a comma separated list of subnets, raising ValueError if invalid. """
+    subnets = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        subnet = ipaddress.ip_network(part, strict=False)
+        if subnet.num_addresses > MAX_SUBNET_HOSTS:
+            raise ValueError(f"{part} has more than {MAX_SUBNET_HOSTS} addresses")
+        subnets.append(subnet)
+    return subnets
+
+
+def parse_ports(value: str) -> List[int]:
+    """ Parse a comma separated list of ports, raising ValueError if invalid. """
+    ports = [int(part) for part in value.split(",") if part.strip()]
+    if any(not 0 < port < 65536 for port in ports):
+        raise ValueError("ports must be between 1 and 65535")
+    return ports
+
+
+def is_shinobi(body: bytes) -> bool:
+    """ Return True if a landing page looks like Shinobi's login page. """
+    return b"shinobi" in body.lower()
+
+
+def _targets(subnets, ports, skip: Set[Tuple[str, int]]) -> Iterator[Tuple[str, int]]:
+    for subnet in subnets:
+        # a /32 has no "hosts" but is the way to scan a single address
+        hosts = subnet.hosts() if subnet.num_addresses > 2 else iter(subnet)
+        for address in hosts:
+            for port in ports:
+                if (str(address), port) not in skip:
+                    yield str(address), port
+
+
+async def async_discover(
+    session: aiohttp.ClientSession,
+    subnets: Iterable[ipaddress.IPv4Network],
+    ports: Iterable[int],
+    skip: Iterable[Tuple[str, int]] = (),
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+) -> List[DiscoveredServer]:
+    """ Scan every host and port concurrently and return the Shinobi servers.
+
+    A fixed pool of workers consumes the targets, so memory stays flat no
+    matter how many addresses are scanned.
+    """
+    targets = _targets(list(subnets), list(ports), set(skip))
+    found: List[DiscoveredServer] = []
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    started = perf_counter()
+    scanned = 0
+
+    async def worker():
+        nonlocal scanned
+        for host, port in targets:
+            scanned += 1
+            server = await _async_fingerprint(session, host, port, client_timeout)
+            if server is not None:
+                found.append(server)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    _LOGGER.debug(
+        "Scanned %d targets in %.2fs, found %d Shinobi servers",
+        scanned,
+        perf_counter() - started,
+        len(found),
+    )
+    return sorted(
+        found, key=lambda server: (ipaddress.ip_address(server.host), server.port)
+    )
+
+
+async def _async_fingerprint(
+    session: aiohttp.ClientSession,
+    host: str,
+    port: int,
+    timeout: aiohttp.ClientTimeout,
+):
+    started = perf_counter()
+    try:
+        async with session.get(f"http://{host}:{port}/", timeout=timeout) as response:
+            if response.status != 200:
+                return None
+            body = b""
+            while len(body) < FINGERPRINT_BYTES:
+                chunk = await response.content.read(FINGERPRINT_BYTES - len(body))
+                if not chunk:
+                    break
+                body += chunk
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+        return None
+    if not is_shinobi(body):
+        return None
+    return DiscoveredServer(host, port, perf_counter() - started)
@@ -0,0 +1,289 @@
+"""Health checked pool of the Shinobi nodes serving an entry's group."""
+import asyncio
+from datetime import timedelta
+import logging
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlsplit
+
+import aiohttp
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import HomeAssistantType
+from pyshinobicctvapi import Client as ShinobiClient, Connection as ShinobiConnection
+
+from .breaker import CircuitBreaker
+from .util import BodyTooLarge, base_url
+
+_LOGGER = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_CHECK_TIMEOUT = 5
+LATENCY_ALPHA = 0.3
+# assumed for nodes that have not answered yet, so they get tried early
+UNMEASURED_LATENCY = 0.05
+
+T = TypeVar("T")
+
+
+def parse_endpoints(value: str) -> List[Tuple[str, Optional[int]]]:
+    """ Parse a comma separated list of host[:port], raising ValueError if invalid. """
+    endpoints = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        parts = urlsplit(part if "://" in part else f"http://{part}")
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"{part} is not a host")
+        # raises ValueError for ports out of range
+        port = parts.port
+        host = parts.hostname
+        if parts.scheme == "https":
+            host = f"https://{host}"
+        endpoints.append((host, port))
+    return endpoints
+
+
+class Endpoint:
+    """ One Shinobi node with its own breaker, latency and load. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        host: str,
+        port: Optional[int],
+        connection: ShinobiConnection,
+    ):
+        """ Initialize an unmeasured node. """
+        self.base_url = base_url(host, port)
+        self.connection = connection
+        self.client = ShinobiClient(connection)
+        self.breaker = CircuitBreaker(hass, f"Shinobi node {self.base_url}")
+        self.latency: Optional[float] = None
+        # requests in flight and monitors whose streams were assigned here
+        self.active = 0
+        self.assigned = 0
+
+    @property
+    def healthy(self) -> bool:
+        """ Return True while the node's breaker is closed. """
+        return self.breaker.closed
+
+    @property
+    def score(self) -> float:
+        """ Return the expected cost of one more request, lower is better. """
+        latency = UNMEASURED_LATENCY if self.latency is None else self.latency
+        return latency * (1 + self.active + self.assigned)
+
+    def record(self, latency: float):
+        """ Fold a request's latency into the average. """
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_ALPHA * (latency - self.latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation, without credentials. """
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "latency": self.latency,
+            "active": self.active,
+            "assigned": self.assigned,
+            "breaker": self.breaker.as_dict(),
+        }
+
+
+class EndpointPool:
+    """ Spread an entry's traffic over the healthy nodes of its group.
+
+    Urls of any node are rebased onto the node picked for a request, which
+    is the healthy one with the lowest latency weighted by its load. Short
+    requests fail over to the next node. Streams go to the node assigned to
+    their monitor, which is kept for as long as it stays healthy. Nodes
+    are health checked concurrently and those with an open breaker only get
+    the breaker's probes, until they answer again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        session: aiohttp.ClientSession,
+        endpoints: List[Endpoint],
+    ):
+        """ Initialize the pool, the first endpoint is the configured host. """
+        self._hass = hass
+        self._session = session
+        self.endpoints = endpoints
+        self._affinity: Dict[Hashable, Endpoint] = {}
+        self._cancel_checks: Optional[CALLBACK_TYPE] = None
+        for endpoint in endpoints:
+            endpoint.breaker.probe = (
+                lambda endpoint=endpoint: self.async_check(endpoint)
+            )
+
+    @property
+    def primary(self) -> Endpoint:
+        """ Return the node configured as the entry's host. """
+        return self.endpoints[0]
+
+    @property
+    def best(self) -> Endpoint:
+        """ Return the healthy node with the lowest score, or the primary. """
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        if not healthy:
+            return self.primary
+        return min(healthy, key=lambda endpoint: endpoint.score)
+
+    def rebase(self, url: str, endpoint: Endpoint) -> str:
+        """ Return url pointed at endpoint, if it belongs to a node of the pool. """
+        for other in self.endpoints:
+            if url == other.base_url or url.startswith(other.base_url + "/"):
+                return endpoint.base_url + url[len(other.base_url) :]
+        return url
+
+    def assign(self, affinity: Hashable) -> Endpoint:
+        """ Return the node assigned to affinity, reassigning it if unhealthy. """
+        endpoint = self._affinity.get(affinity)
+        if endpoint is not None and endpoint.healthy:
+            return endpoint
+        endpoint = self.best
+        self._assign_to(affinity, endpoint)
+        return endpoint
+
+    def _assign_to(self, affinity: Hashable, endpoint: Endpoint):
+        if self._affinity.get(affinity) is not endpoint:
+            self.release(affinity)
+            self._affinity[affinity] = endpoint
+            endpoint.assigned += 1
+
+    def release(self, affinity: Hashable):
+        """ Forget the node assigned to affinity, e.g. a removed monitor. """
+        endpoint = self._affinity.pop(affinity, None)
+        if endpoint is not None:
+            endpoint.assigned -= 1
+
+    def _candidates(self, affinity: Optional[Hashable]) -> Iterator[Endpoint]:
+        first = self.best if affinity is None else self.assign(affinity)
+        yield first
+        healthy = sorted(
+            (e for e in self.endpoints if e.healthy and e is not first),
+            key=lambda endpoint: endpoint.score,
+        )
+        yield from healthy
+        # last resort, nodes whose breaker lets a probe through
+        for endpoint in self.endpoints:
+            if endpoint is not first and not endpoint.healthy:
+                if endpoint.breaker.allow():
+                    yield endpoint
+
+    async def async_request(
+        self,
+        request: Callable[[Endpoint], Awaitable[T]],
+        affinity: Optional[Hashable] = None,
+    ) -> T:
+        """ Run request on the best node, failing over to the others.
+
+        Connection errors, timeouts and server errors move on to the next
+        node and count against the failed one. Client errors such as 404
+        come from a node that works, so they are raised right away.
+        """
+        error: Optional[BaseException] = None
+        for endpoint in self._candidates(affinity):
+            endpoint.active += 1
+            started = perf_counter()
+            try:
+                result = await request(endpoint)
+            except BodyTooLarge:
+                # the node answered, any other would send the same body
+                endpoint.breaker.record_success()
+                raise
+            except aiohttp.ClientResponseError as err:
+                if err.status < 500:
+                    endpoint.breaker.record_success()
+                    raise
+                error = err
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as err:
+                error = err
+            else:
+                endpoint.record(perf_counter() - started)
+                endpoint.breaker.record_success()
+                if affinity is not None:
+                    self._assign_to(affinity, endpoint)
+                return result
+            finally:
+                endpoint.active -= 1
+
+            # a failing node should lose the next pick even before its breaker opens
+            endpoint.record(max(perf_counter() - started, HEALTH_CHECK_TIMEOUT))
+            endpoint.breaker.record_failure()
+            if affinity is not None:
+                self.release(affinity)
+            _LOGGER.debug(
+                "%s failed, trying the next node: %s", endpoint.base_url, error
+            )
+        raise error or aiohttp.ClientConnectionError("No Shinobi node available")
+
+    async def async_check(self, endpoint: Endpoint) -> bool:
+        """ Check that a node answers, recording the result on its breaker. """
+        started = perf_counter()
+        try:
+            async with self._session.get(
+                endpoint.base_url + "/",
+                timeout=aiohttp.ClientTimeout(total=HEALTH_CHECK_TIMEOUT),
+            ) as response:
+                healthy = response.status < 500
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as err:
+            _LOGGER.debug("Health check of %s failed: %s", endpoint.base_url, err)
+            healthy = False
+
+        if healthy:
+            endpoint.record(perf_counter() - started)
+            endpoint.breaker.record_success()
+        else:
+            endpoint.record(max(perf_counter() - started, HEALTH_CHECK_TIMEOUT))
+            endpoint.breaker.record_failure()
+        return healthy
+
+    async def async_check_all(self):
+        """ Check every node concurrently. """
+        await asyncio.gather(*[self.async_check(e) for e in self.endpoints])
+
+    async def _async_check_interval(self, _now):
+        await self.async_check_all()
+
+    @callback
+    def async_start(self):
+        """ Start the periodic health checks, only needed with several nodes. """
+        if self._cancel_checks is None and len(self.endpoints) > 1:
+            self._hass.async_create_task(self.async_check_all())
+            self._cancel_checks = async_track_time_interval(
+                self._hass,
+                self._async_check_interval,
+                timedelta(seconds=HEALTH_CHECK_INTERVAL),
+            )
+
+    @callback
+    def async_stop(self):
+        """ Stop the health checks and every scheduled probe. """
+        if self._cancel_checks is not None:
+            self._cancel_checks()
+            self._cancel_checks = None
+        for endpoint in self.endpoints:
+            endpoint.breaker.async_stop()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {"endpoints": [endpoint.as_dict() for endpoint in self.endpoints]}
@@ -1,37 +1,115 @@
-from typing import Generic, TypeVar
+import logging
+from typing import Callable, Generic, Iterable, List, Set, TypeVar
 
-from pyshinobicctvapi import Client as ShinobiClient
-from pyshinobicctvapi.manager import Manager as GenericManager
 from . import ATTRIBUTION
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ATTRIBUTION
 from .const import DEFAULT_BRAND, DOMAIN
+from .coordinator import ShinobiMonitorCoordinator
+from .events import ShinobiEventClient
 from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.typing import HomeAssistantType
 from pyshinobicctvapi.entity import Entity as ShinobiEntity
+from pyshinobicctvapi.monitors import Monitor
 
 E = TypeVar("E", bound=ShinobiEntity)
 T = TypeVar("T", bound="EntityMixin")
 
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_add_monitor_entities(
+    hass: HomeAssistantType,
+    entry: ConfigEntry,
+    async_add_entities,
+    create: Callable[[Monitor], Iterable[Entity]],
+) -> int:
+    """ Add entities for the current monitors and for every monitor added later.
+
+    Only the monitors the coordinator reports as added are looked at on
+    updates, removed ones retire their own entities. Returns the number of
+    entities added now.
+    """
+    info = hass.data[DOMAIN][entry.entry_id]
+    coordinator: ShinobiMonitorCoordinator = info["coordinator"]
+    known: Set[str] = set()
+
+    def add(monitor_ids: Iterable[str]) -> List[Entity]:
+        entities = []
+        for monitor_id in monitor_ids:
+            if monitor_id not in known:
+                known.add(monitor_id)
+                entities.extend(create(coordinator.data[monitor_id]))
+        if entities:
+            async_add_entities(entities)
+        return entities
+
+    @callback
+    def reconcile():
+        known.difference_update(coordinator.removed)
+        if coordinator.added:
+            added = add(coordinator.added)
+            _LOGGER.debug("Added %d entities for new monitors", len(added))
+
+    # a coordinator with listeners keeps polling, even after the entry unloads
+    info["unload_callbacks"].append(coordinator.async_add_listener(reconcile))
+    return len(add(coordinator.data))
+
 
 class EntityMixin(Generic[E]):
     """ Base class form Shinobi device. """
 
-    def __init__(self, config_entry_id: str, device: E, managerKey: str):
+    def __init__(self, config_entry_id: str, device: E):
         """ Initialize an entity for Shinobi device. """
         super().__init__()
         self._config_entry_id = config_entry_id
         self._device = device
-        self._managerKey = managerKey
+        self._remove_listeners = []
+        self._was_available = True
 
     async def async_added_to_hass(self):
         """ Register callbacks. """
-
-        client: ShinobiClient = self.shinobi_objects.get("client")
-        manager: GenericManager[E] = getattr(client, self._managerKey)
-        device = await manager.async_get((self._device.id))
-        self._device = device
+        self._was_available = self.available
+        self._remove_listeners = [
+            self.coordinator.async_add_listener(self._handle_coordinator_update),
+            self.events.async_subscribe(self._device.id, self._handle_event_update),
+        ]
 
     async def async_will_remove_from_hass(self):
         """ Disconnect callbacks. """
+        for remove in self._remove_listeners:
+            remove()
+        self._remove_listeners = []
+
+    @callback
+    def _handle_coordinator_update(self):
+        """ Take the refreshed device and write state only if it changed. """
+        coordinator = self.coordinator
+        if self._device.id in coordinator.removed:
+            # stopped or deleted on the NVR, the entity returns if the monitor does
+            self.hass.async_create_task(self.async_remove())
+            return
+
+        device = (coordinator.data or {}).get(self._device.id)
+        available = self.available
+        if device is not None and self._device.id in coordinator.changed:
+            self._device = device
+            self._handle_device_update()
+        elif available == self._was_available:
+            return
+        self._was_available = available
+        self._update_callback()
+
+    @callback
+    def _handle_device_update(self):
+        """ Refresh derived state after the device was replaced. """
+
+    @callback
+    def _handle_event_update(self):
+        """ Handle events pushed for the device. """
+        self._update_callback()
 
     @callback
     def _update_callback(self):
@@ -43,10 +121,33 @@ class EntityMixin(Generic[E]):
         """ Return the Shinobi API objects. """
         return self.hass.data[DOMAIN][self._config_entry_id]
 
+    @property
+    def config_entry(self) -> ConfigEntry:
+        """ Return the config entry this entity belongs to. """
+        return self.hass.config_entries.async_get_entry(self._config_entry_id)
+
+    @property
+    def coordinator(self) -> ShinobiMonitorCoordinator:
+        """ Return the monitor coordinator of the config entry. """
+        return self.shinobi_objects["coordinator"]
+
+    @property
+    def events(self) -> ShinobiEventClient:
+        """ Return the event socket client of the config entry. """
+        return self.shinobi_objects["events"]
+
     @property
     def should_poll(self):
         return False
 
+    @property
+    def available(self):
+        """ Return True if the device was part of the last successful update. """
+        coordinator = self.coordinator
+        return coordinator.last_update_success and self._device.id in (
+            coordinator.data or {}
+        )
+
     @property
     def device_state_attributes(self):
         """ Return the state attributes. """
@@ -60,4 +161,4 @@ class EntityMixin(Generic[E]):
             "name": self._device.name,
             "model": "IP Camera",
             "manufacturer": DEFAULT_BRAND,
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,199 @@
+"""Shinobi event socket client."""
+import asyncio
+import json
+import logging
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+import aiohttp
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.typing import HomeAssistantType
+import homeassistant.util.dt as dt_util
+
+from .util import base_url
+
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_MONITOR_STATUS = "monitor_status"
+EVENT_DETECTOR_TRIGGER = "detector_trigger"
+
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+DEFAULT_PING_INTERVAL = 25
+
+
+def socket_url(host: str, port: Optional[int]) -> str:
+    """ Return the socket.io websocket url of a Shinobi server. """
+    url = base_url(host, port)
+    scheme = "wss" if url.startswith("https") else "ws"
+    return f"{scheme}{url[url.index(':'):]}/socket.io/?EIO=3&transport=websocket"
+
+
+class Detection(NamedTuple):
+    time: datetime
+    details: Dict[str, Any]
+
+
+class ShinobiEventClient:
+    """ Receive monitor status and detector events from Shinobi's socket. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        session: aiohttp.ClientSession,
+        url: Callable[[], str],
+        token: str,
+        group: str,
+    ):
+        """ Initialize the client, call async_start to connect.
+
+        url returns the socket url to use, it is called before every connect.
+        """
+        self._hass = hass
+        self._session = session
+        self._resolve_url = url
+        self.url = url()
+        self._token = token
+        self._group = group
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: Dict[str, List[CALLBACK_TYPE]] = {}
+        self._status_listeners: List[CALLBACK_TYPE] = []
+        self._pending: Set[str] = set()
+        self._flush_scheduled = False
+        self.connected = False
+        self.status: Dict[str, str] = {}
+        self.detections: Dict[str, Detection] = {}
+
+    @callback
+    def async_subscribe(self, monitor_id: str, update_callback: CALLBACK_TYPE):
+        """ Call update_callback once per loop tick the monitor had events. """
+        listeners = self._listeners.setdefault(monitor_id, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove():
+            listeners.remove(update_callback)
+
+        return remove
+
+    @callback
+    def async_subscribe_status(self, update_callback: CALLBACK_TYPE):
+        """ Call update_callback when the status of any monitor changes. """
+        self._status_listeners.append(update_callback)
+
+        @callback
+        def remove():
+            self._status_listeners.remove(update_callback)
+
+        return remove
+
+    @callback
+    def async_start(self):
+        """ Connect in the background, reconnecting with backoff. """
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._async_run())
+
+    async def async_stop(self):
+        """ Disconnect from the event socket. """
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.connected = False
+
+    async def _async_run(self):
+        delay = RECONNECT_MIN
+        while True:
+            self.url = self._resolve_url()
+            try:
+                await self._async_listen()
+                delay = RECONNECT_MIN
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+                _LOGGER.debug("Event socket %s failed: %s", self.url, err)
+            finally:
+                self.connected = False
+
+            wait = delay * (1 + random.random() / 2)
+            _LOGGER.debug("Reconnecting to event socket in %.1fs", wait)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def _async_listen(self):
+        async with self._session.ws_connect(self.url, heartbeat=None) as socket:
+            ping_task = None
+            try:
+                async for message in socket:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    data: str = message.data
+                    if data.startswith("0"):
+                        interval = json.loads(data[1:]).get(
+                            "pingInterval", DEFAULT_PING_INTERVAL * 1000
+                        )
+                        ping_task = self._hass.async_create_task(
+                            self._async_ping(socket, interval / 1000)
+                        )
+                    elif data == "2":
+                        await socket.send_str("3")
+                    elif data == "40":
+                        await socket.send_str(
+                            "42"
+                            + json.dumps(
+                                ["f", {"f": "init", "auth": self._token, "ke": self._group}]
+                            )
+                        )
+                        self.connected = True
+                        _LOGGER.debug("Connected to event socket %s", self.url)
+                    elif data.startswith("42"):
+                        self._handle_message(json.loads(data[2:]))
+            finally:
+                if ping_task is not None:
+                    ping_task.cancel()
+
+    @staticmethod
+    async def _async_ping(socket: aiohttp.ClientWebSocketResponse, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await socket.send_str("2")
+
+    @callback
+    def _handle_message(self, message: list):
+        if len(message) < 2 or not isinstance(message[1], dict):
+            return
+        event = message[1]
+        monitor_id = event.get("id") or event.get("mid")
+        if monitor_id is None or event.get("ke", self._group) != self._group:
+            return
+
+        kind = event.get("f")
+        if kind == EVENT_MONITOR_STATUS:
+            status = event.get("status")
+            previous = self.status.get(monitor_id)
+            self.status[monitor_id] = status
+            if previous != status:
+                for update_callback in list(self._status_listeners):
+                    update_callback()
+        elif kind == EVENT_DETECTOR_TRIGGER:
+            self.detections[monitor_id] = Detection(
+                dt_util.utcnow(), event.get("details") or {}
+            )
+        else:
+            return
+
+        self._pending.add(monitor_id)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._hass.loop.call_soon(self._flush)
+
+    @callback
+    def _flush(self):
+        """ Notify each monitor's listeners once for a burst of events. """
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, set()
+        for monitor_id in pending:
+            for update_callback in list(self._listeners.get(monitor_id, ())):
+                update_callback()
@@ -0,0 +1,140 @@
+"""Long-lived ffmpeg frame grabber for Shinobi monitors."""
+import asyncio
+import logging
+from time import monotonic
+from typing import Optional
+
+from haffmpeg.core import HAFFmpeg
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .mjpeg import READ_SIZE, JpegFrameParser
+from .scheduler import PRIORITY_STILL, FFmpegScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FrameGrabber:
+    """ Keep one ffmpeg process decoding a stream into a latest-frame slot. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        ffmpeg_bin: str,
+        scheduler: FFmpegScheduler,
+        url: str,
+        fps: float,
+        idle_timeout: float,
+    ):
+        """ Initialize the grabber, ffmpeg is started on first use. """
+        self._hass = hass
+        self._ffmpeg_bin = ffmpeg_bin
+        self._scheduler = scheduler
+        self.url = url
+        self._fps = fps
+        self.idle_timeout = idle_timeout
+        self._ffmpeg: Optional[HAFFmpeg] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._frame: Optional[bytes] = None
+        self._frame_event = asyncio.Event()
+        self._last_request = 0.0
+        self._cancel_idle = None
+        # concurrent first requests must not each start an ffmpeg
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """ Return True while ffmpeg is attached to the stream. """
+        return self._reader_task is not None and not self._reader_task.done()
+
+    async def async_get_image(self, timeout: float) -> Optional[bytes]:
+        """ Return the latest decoded frame, starting ffmpeg if needed.
+
+        Raises NoSlotAvailable if no scheduler slot frees up within timeout,
+        so the caller can fall over to another source without blaming the
+        stream.
+        """
+        self._last_request = monotonic()
+        if not self.is_running:
+            async with self._start_lock:
+                if not self.is_running and not await self._async_start(timeout):
+                    return None
+
+        if self._frame is None:
+            try:
+                await asyncio.wait_for(self._frame_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.debug("No frame from %s within %ss", self.url, timeout)
+
+        return self._frame
+
+    async def _async_start(self, timeout: float) -> bool:
+        await self.async_stop()
+
+        _LOGGER.debug("Starting frame grabber for %s", self.url)
+        self._frame = None
+        self._frame_event.clear()
+        # the decoder holds a scheduler slot for as long as it runs
+        await self._scheduler.async_acquire(PRIORITY_STILL, timeout)
+        ffmpeg = HAFFmpeg(self._ffmpeg_bin)
+        started = await ffmpeg.open(
+            cmd=["-an", "-vf", f"fps={self._fps}", "-c:v", "mjpeg"],
+            input_source=self.url,
+            output="-f image2pipe -",
+        )
+        if not started:
+            self._scheduler.release()
+            _LOGGER.warning("Unable to start frame grabber for %s", self.url)
+            return False
+
+        self._ffmpeg = ffmpeg
+        reader = await ffmpeg.get_reader()
+        self._reader_task = self._hass.async_create_task(self._async_read(reader))
+        self._schedule_idle_check(self.idle_timeout)
+        return True
+
+    async def _async_read(self, reader: asyncio.StreamReader):
+        """ Split the image2pipe output into JPEG frames. """
+        parser = JpegFrameParser()
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                break
+            frames = parser.feed(chunk)
+            if frames:
+                self._frame = frames[-1]
+                self._frame_event.set()
+
+        _LOGGER.debug("Frame grabber for %s exited", self.url)
+
+    @callback
+    def _schedule_idle_check(self, delay: float):
+        if self._cancel_idle is not None:
+            self._cancel_idle()
+        self._cancel_idle = async_call_later(self._hass, delay, self._async_idle_check)
+
+    async def _async_idle_check(self, _now):
+        self._cancel_idle = None
+        idle = monotonic() - self._last_request
+        if idle < self.idle_timeout:
+            self._schedule_idle_check(self.idle_timeout - idle)
+            return
+        _LOGGER.debug("Frame grabber for %s idle for %.0fs", self.url, idle)
+        await self.async_stop()
+
+    async def async_stop(self):
+        """ Stop ffmpeg and forget the latest frame. """
+        if self._cancel_idle is not None:
+            self._cancel_idle()
+            self._cancel_idle = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._ffmpeg is not None:
+            ffmpeg, self._ffmpeg = self._ffmpeg, None
+            try:
+                await ffmpeg.close()
+            finally:
+                self._scheduler.release()
+        self._frame = None
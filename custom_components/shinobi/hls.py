@@ -0,0 +1,87 @@
+"""Helpers to proxy Shinobi's own HLS streams."""
+from datetime import timedelta
+import re
+from typing import Callable, Optional
+from urllib.parse import urljoin
+
+PLAYLIST_TTL = 1
+SEGMENT_TTL = 60
+MAX_FILE_SIZE = 16 * 1024 * 1024
+
+# wraps the monitor's playlist, so players get a link signed long enough to
+# keep reloading it while the link they were handed expires quickly
+MASTER_PLAYLIST = "_master.m3u8"
+# the only variant, players have nothing to choose between
+MASTER_BANDWIDTH = 2000000
+PLAYLIST_LINK_TTL = timedelta(hours=24)
+SEGMENT_LINK_TTL = timedelta(minutes=5)
+
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+_URI_ATTRIBUTE = re.compile(rb'URI="([^"]+)"')
+
+
+def is_playlist(name: str) -> bool:
+    """ Return True if name is a playlist rather than a media segment. """
+    return name.endswith(".m3u8")
+
+
+def content_type(name: str) -> Optional[str]:
+    """ Return the content type of an HLS file, None if it is not one. """
+    for extension, value in CONTENT_TYPES.items():
+        if name.endswith(extension):
+            return value
+    return None
+
+
+def is_hls_url(url: str) -> bool:
+    """ Return True if a stream url points at an HLS playlist. """
+    return is_playlist(url.split("?", 1)[0])
+
+
+def link_ttl(name: str) -> timedelta:
+    """ Return how long a link to an HLS file stays valid. """
+    return PLAYLIST_LINK_TTL if is_playlist(name) else SEGMENT_LINK_TTL
+
+
+def master_playlist(link: str) -> bytes:
+    """ Return a master playlist with link as its only variant. """
+    return (
+        f"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH={MASTER_BANDWIDTH}\n{link}\n"
+    ).encode()
+
+
+def rewrite_playlist(
+    playlist: bytes, playlist_url: str, link: Callable[[str], str]
+) -> bytes:
+    """ Point the playlist's URIs at the proxy, next to the playlist itself.
+
+    link returns the URI of a file name relative to the proxied playlist.
+    Only URIs in the playlist's own directory are rewritten; anything else
+    is left as is, so the proxy never fetches urls outside the stream.
+    """
+    base = playlist_url.split("?", 1)[0].rsplit("/", 1)[0] + "/"
+
+    def proxied(uri: bytes) -> bytes:
+        url = urljoin(playlist_url, uri.decode(errors="replace"))
+        name = url[len(base) :].split("?", 1)[0] if url.startswith(base) else ""
+        if not name or "/" in name:
+            return uri
+        return link(name).encode()
+
+    lines = []
+    for line in playlist.splitlines():
+        stripped = line.strip()
+        if stripped.startswith(b"#"):
+            line = _URI_ATTRIBUTE.sub(
+                lambda match: b'URI="%s"' % proxied(match.group(1)), line
+            )
+        elif stripped:
+            line = proxied(stripped)
+        lines.append(line)
+    return b"\n".join(lines) + b"\n"
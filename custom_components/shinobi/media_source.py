@@ -0,0 +1,210 @@
+"""Shinobi recordings as a Home Assistant media source."""
+from datetime import date
+import logging
+from typing import Optional, Tuple
+
+from homeassistant.components.media_player.const import (
+    MEDIA_CLASS_DIRECTORY,
+    MEDIA_CLASS_VIDEO,
+    MEDIA_TYPE_VIDEO,
+)
+from homeassistant.components.media_source.error import Unresolvable
+from homeassistant.components.media_source.models import (
+    BrowseMediaSource,
+    MediaSource,
+    MediaSourceItem,
+    PlayMedia,
+)
+from homeassistant.helpers.typing import HomeAssistantType
+import homeassistant.util.dt as dt_util
+
+from .const import CONF_HLS_PASSTHROUGH, DEFAULT_BRAND, DEFAULT_HLS_PASSTHROUGH, DOMAIN
+from .hls import CONTENT_TYPES, MASTER_PLAYLIST
+from .recordings import Recording, RecordingIndex
+from .signing import LINK_TTL, sign_path
+
+_LOGGER = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+MEDIA_TYPE_DIRECTORY = "directory"
+LIVE = "live"
+
+
+async def async_get_media_source(hass: HomeAssistantType) -> MediaSource:
+    """Set up Shinobi media source."""
+    return ShinobiMediaSource(hass)
+
+
+class ShinobiMediaSource(MediaSource):
+    """ Browse recordings by config entry, monitor, day and page.
+
+    Identifiers are entry_id[/monitor_id[/day[/page]]] for directories,
+    entry_id/monitor_id/day/v/key for a recording and entry_id/monitor_id/live
+    for the proxied HLS stream of a monitor.
+    """
+
+    name = DEFAULT_BRAND
+
+    def __init__(self, hass: HomeAssistantType):
+        """ Initialize the media source. """
+        super().__init__(DOMAIN)
+        self.hass = hass
+
+    async def async_resolve_media(self, item: MediaSourceItem) -> PlayMedia:
+        """ Resolve a recording or live stream to a path of the proxy views.
+
+        Relative paths are signed by media source for the requesting user.
+        """
+        parts = (item.identifier or "").split("/")
+        if len(parts) == 3 and parts[2] == LIVE:
+            url = self._live_url(parts[0], parts[1])
+            if url is None:
+                raise Unresolvable(f"No live stream for {item.identifier}")
+            return PlayMedia(url, CONTENT_TYPES[".m3u8"])
+
+        if len(parts) != 5 or parts[3] != "v":
+            raise Unresolvable(f"Unknown recording {item.identifier}")
+
+        info = self._entry_info(parts[0])
+        recording = info["recordings"].get(parts[1], parts[4])
+        if recording is None:
+            raise Unresolvable(f"Unknown recording {item.identifier}")
+        return PlayMedia(
+            f"/api/shinobi/recording/{parts[0]}/{parts[1]}/{recording.key}",
+            recording.mime_type,
+        )
+
+    async def async_browse_media(
+        self, item: MediaSourceItem, media_types: Tuple[str] = (MEDIA_TYPE_VIDEO,)
+    ) -> BrowseMediaSource:
+        """ Return one level of the recordings tree. """
+        parts = [part for part in (item.identifier or "").split("/") if part]
+
+        if not parts:
+            return self._directory(
+                "",
+                self.name,
+                [
+                    self._directory(entry_id, self._entry_title(entry_id))
+                    for entry_id in self.hass.data.get(DOMAIN, {})
+                ],
+            )
+
+        entry_id = parts[0]
+        info = self._entry_info(entry_id)
+        monitors = info["coordinator"].data or {}
+        if len(parts) == 1:
+            return self._directory(
+                entry_id,
+                self._entry_title(entry_id),
+                [
+                    self._directory(f"{entry_id}/{monitor_id}", monitor.name)
+                    for monitor_id, monitor in monitors.items()
+                ],
+            )
+
+        index: RecordingIndex = info["recordings"]
+        await index.async_sync()
+        monitor_id = parts[1]
+        monitor = monitors.get(monitor_id)
+        monitor_name = monitor.name if monitor is not None else monitor_id
+        if len(parts) == 2:
+            children = [
+                self._directory(
+                    f"{entry_id}/{monitor_id}/{day.isoformat()}",
+                    f"{day.isoformat()} ({index.count(monitor_id, day)})",
+                )
+                for day in index.days(monitor_id)
+            ]
+            if self._live_url(entry_id, monitor_id) is not None:
+                children.insert(0, self._live(entry_id, monitor_id))
+            return self._directory(f"{entry_id}/{monitor_id}", monitor_name, children)
+
+        try:
+            day = date.fromisoformat(parts[2])
+            page = int(parts[3]) if len(parts) > 3 else 0
+        except ValueError as err:
+            raise Unresolvable(f"Unknown path {item.identifier}") from err
+
+        path = f"{entry_id}/{monitor_id}/{parts[2]}"
+        children = [
+            self._recording(entry_id, path, recording)
+            for recording in index.day(monitor_id, day, page * PAGE_SIZE, PAGE_SIZE)
+        ]
+        if (page + 1) * PAGE_SIZE < index.count(monitor_id, day):
+            children.append(self._directory(f"{path}/{page + 1}", "Older…"))
+        title = f"{monitor_name} {parts[2]}"
+        return self._directory(
+            f"{path}/{page}" if page else path,
+            title if not page else f"{title} ({page + 1})",
+            children,
+        )
+
+    def _entry_info(self, entry_id: str) -> dict:
+        info = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        if info is None:
+            raise Unresolvable(f"Unknown Shinobi entry {entry_id}")
+        return info
+
+    def _live_url(self, entry_id: str, monitor_id: str) -> Optional[str]:
+        """ Return the proxied HLS playlist of a monitor, None if unavailable. """
+        info = self._entry_info(entry_id)
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        camera = info["cameras"].get(monitor_id)
+        if (
+            entry is None
+            or not entry.options.get(CONF_HLS_PASSTHROUGH, DEFAULT_HLS_PASSTHROUGH)
+            or camera is None
+            or camera.hls_source_url is None
+        ):
+            return None
+        return f"/api/shinobi/hls/{entry_id}/{monitor_id}/{MASTER_PLAYLIST}"
+
+    def _live(self, entry_id: str, monitor_id: str) -> BrowseMediaSource:
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{entry_id}/{monitor_id}/{LIVE}",
+            media_class=MEDIA_CLASS_VIDEO,
+            media_content_type=MEDIA_TYPE_VIDEO,
+            title="Live",
+            can_play=True,
+            can_expand=False,
+        )
+
+    def _entry_title(self, entry_id: str) -> str:
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        return entry.title if entry is not None else entry_id
+
+    def _directory(
+        self, identifier: str, title: str, children: Optional[list] = None
+    ) -> BrowseMediaSource:
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=identifier,
+            media_class=MEDIA_CLASS_DIRECTORY,
+            media_content_type=MEDIA_TYPE_DIRECTORY,
+            title=title,
+            can_play=False,
+            can_expand=True,
+            children=children,
+        )
+
+    def _recording(
+        self, entry_id: str, path: str, recording: Recording
+    ) -> BrowseMediaSource:
+        # thumbnails are only generated once the frontend asks for them
+        thumbnail = sign_path(
+            self.hass,
+            f"/api/shinobi/thumbnail/{entry_id}/{recording.monitor_id}/{recording.key}",
+            LINK_TTL,
+        )
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{path}/v/{recording.key}",
+            media_class=MEDIA_CLASS_VIDEO,
+            media_content_type=MEDIA_TYPE_VIDEO,
+            title=dt_util.as_local(recording.start).strftime("%H:%M:%S"),
+            can_play=True,
+            can_expand=False,
+            thumbnail=thumbnail,
+        )
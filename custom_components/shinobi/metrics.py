@@ -0,0 +1,138 @@
+"""Lightweight per-monitor latency and throughput metrics."""
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Deque, Dict, Optional
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LATENCY_WINDOW = 256
+
+OP_CAMERA_IMAGE = "camera_image"
+OP_JPEG_API = "jpeg_api"
+OP_FFMPEG_STILL = "ffmpeg_still"
+OP_FRAME_GRABBER = "frame_grabber"
+OP_MJPEG_CONNECT = "mjpeg_connect"
+OP_MJPEG_FRAME = "mjpeg_frame"
+OP_RESIZE = "resize"
+OP_HLS_UPSTREAM = "hls_upstream"
+
+
+class OperationStats:
+    """ Rolling latency window plus error and timeout counters. """
+
+    __slots__ = ("count", "errors", "timeouts", "_samples")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self._samples: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @contextmanager
+    def measure(self):
+        """ Time the wrapped block and count exceptions raised from it. """
+        started = perf_counter()
+        try:
+            yield self
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.count += 1
+            self._samples.append(perf_counter() - started)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """ Return a latency percentile in seconds over the rolling window. """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def histogram(self) -> Dict[str, int]:
+        """ Return the rolling window bucketed by upper bound in seconds. """
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for sample in self._samples:
+            counts[bisect_left(LATENCY_BUCKETS, sample)] += 1
+        labels = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return dict(zip(labels, counts))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "histogram": self.histogram(),
+        }
+
+
+class MonitorMetrics:
+    """ Metrics recorded for one monitor. """
+
+    def __init__(self):
+        self.operations: Dict[str, OperationStats] = {}
+        self.bytes_served = 0
+        self.active_streams = 0
+        self.stream_buffer_peak = 0
+
+    def operation(self, name: str) -> OperationStats:
+        """ Return the stats of an operation, creating them on first use. """
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = self.operations[name] = OperationStats()
+        return stats
+
+    def record_stream_buffer(self, size: int):
+        """ Record the bytes a stream holds in memory, keeping the peak. """
+        if size > self.stream_buffer_peak:
+            self.stream_buffer_peak = size
+
+    @property
+    def errors(self) -> int:
+        """ Return the number of failed operations of any kind. """
+        return sum(stats.errors + stats.timeouts for stats in self.operations.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "bytes_served": self.bytes_served,
+            "active_streams": self.active_streams,
+            "stream_buffer_peak": self.stream_buffer_peak,
+            "operations": {
+                name: stats.as_dict() for name, stats in self.operations.items()
+            },
+        }
+
+
+class EntryMetrics:
+    """ Metrics recorded for a config entry and each of its monitors. """
+
+    def __init__(self):
+        self.api = OperationStats()
+        self.monitors: Dict[str, MonitorMetrics] = {}
+
+    def monitor(self, monitor_id: str) -> MonitorMetrics:
+        """ Return the metrics of a monitor, creating them on first use. """
+        metrics = self.monitors.get(monitor_id)
+        if metrics is None:
+            metrics = self.monitors[monitor_id] = MonitorMetrics()
+        return metrics
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "api": self.api.as_dict(),
+            "monitors": {
+                monitor_id: metrics.as_dict()
+                for monitor_id, metrics in self.monitors.items()
+            },
+        }
@@ -0,0 +1,382 @@
+"""MJPEG frame parsing and fan-out for Shinobi monitors."""
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+from haffmpeg.camera import CameraMjpeg
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .metrics import OP_MJPEG_CONNECT, MonitorMetrics
+from .scheduler import PRIORITY_STREAM, FFmpegScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+READ_SIZE = 64 * 1024
+# larger frames are dropped, so a corrupt stream can't grow the buffer forever
+MAX_FRAME_SIZE = 8 * 1024 * 1024
+SUBSCRIBER_QUEUE_SIZE = 2
+BOUNDARY = "shinobiframe"
+FFMPEG_BOUNDARY = b"ffmpeg"
+
+
+def parse_boundary(content_type: str) -> Optional[bytes]:
+    """ Return the multipart boundary of a content type header, if any. """
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            return value.strip('"').encode()
+    return None
+
+
+def _copy(buffer: bytearray, start: int, end: int) -> bytes:
+    """ Copy a slice of buffer once, without an intermediate bytearray. """
+    with memoryview(buffer) as view:
+        return bytes(view[start:end])
+
+
+class JpegFrameParser:
+    """ Split a raw byte stream into JPEG images using SOI/EOI markers. """
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+
+    @property
+    def buffered(self) -> int:
+        """ Return the number of bytes held waiting for the rest of a frame. """
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """ Consume data and return every complete frame found. """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = buffer.find(JPEG_SOI)
+            if start < 0:
+                # the marker's first byte may be all that arrived so far
+                del buffer[: -1 if buffer.endswith(JPEG_SOI[:1]) else len(buffer)]
+                break
+            end = buffer.find(JPEG_EOI, start + 2)
+            if end < 0:
+                del buffer[:start]
+                if len(buffer) > self._max_frame_size:
+                    _LOGGER.debug("Dropping a JPEG frame over %d bytes", len(buffer))
+                    buffer.clear()
+                break
+            frames.append(_copy(buffer, start, end + 2))
+            del buffer[: end + 2]
+        return frames
+
+
+class MultipartFrameParser:
+    """ Split a multipart/x-mixed-replace byte stream into part bodies. """
+
+    def __init__(self, boundary: bytes, max_frame_size: int = MAX_FRAME_SIZE):
+        if not boundary.startswith(b"--"):
+            boundary = b"--" + boundary
+        self._delimiter = boundary
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+
+    @property
+    def buffered(self) -> int:
+        """ Return the number of bytes held waiting for the rest of a part. """
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """ Consume data and return every complete part body found. """
+        buffer = self._buffer
+        buffer += data
+        delimiter = self._delimiter
+        frames = []
+        while True:
+            start = buffer.find(delimiter)
+            if start < 0:
+                # keep enough to match a delimiter split across reads
+                del buffer[: max(0, len(buffer) - len(delimiter))]
+                break
+            headers_end = buffer.find(b"\r\n\r\n", start)
+            if headers_end < 0:
+                del buffer[:start]
+                break
+            body_start = headers_end + 4
+            length = self._content_length(_copy(buffer, start, headers_end))
+            if length is not None and length > self._max_frame_size:
+                _LOGGER.debug("Skipping a multipart frame of %d bytes", length)
+                # drop this delimiter so the search resumes at the next part
+                del buffer[: start + len(delimiter)]
+                continue
+            if length is not None:
+                body_end = body_start + length
+                if len(buffer) < body_end:
+                    del buffer[:start]
+                    break
+                next_start = body_end
+            else:
+                body_end = buffer.find(delimiter, body_start)
+                if body_end < 0:
+                    del buffer[:start]
+                    break
+                next_start = body_end
+                while body_end > body_start and buffer[body_end - 1] in b"\r\n":
+                    body_end -= 1
+            frames.append(_copy(buffer, body_start, body_end))
+            del buffer[:next_start]
+        if len(buffer) > self._max_frame_size + READ_SIZE:
+            _LOGGER.debug("Dropping a multipart frame over %d bytes", len(buffer))
+            buffer.clear()
+        return frames
+
+    @staticmethod
+    def _content_length(headers: bytes) -> Optional[int]:
+        for line in headers.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+        return None
+
+
+async def async_read_frame(response: aiohttp.ClientResponse) -> Optional[bytes]:
+    """ Return the first frame of an MJPEG response, None if it ends first. """
+    boundary = parse_boundary(response.headers.get("Content-Type", ""))
+    parser = MultipartFrameParser(boundary) if boundary else JpegFrameParser()
+    while True:
+        chunk = await response.content.read(READ_SIZE)
+        if not chunk:
+            return None
+        frames = parser.feed(chunk)
+        if frames:
+            return frames[0]
+
+
+class MjpegHub(ABC):
+    """ Share one upstream MJPEG source between all viewers of a monitor. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        name: str,
+        grace_period: float = 0,
+        metrics: Optional[MonitorMetrics] = None,
+    ):
+        """ Initialize the hub, the upstream is opened on first subscriber. """
+        self._hass = hass
+        self._name = name
+        self._grace_period = grace_period
+        self._metrics = metrics or MonitorMetrics()
+        # every viewer's queue of encoded parts and the bytes waiting in it
+        self._subscribers: Dict[asyncio.Queue, int] = {}
+        self._upstream_task: Optional[asyncio.Task] = None
+        self._cancel_close = None
+        self.latest_frame: Optional[bytes] = None
+        self.latest_frame_at = 0.0
+
+    @property
+    def viewers(self) -> int:
+        """ Return the number of subscribed viewers. """
+        return len(self._subscribers)
+
+    async def async_handle(self, request: web.Request) -> web.StreamResponse:
+        """ Stream frames from the shared upstream to one viewer. """
+        queue = self._subscribe()
+        metrics = self._metrics
+        metrics.active_streams += 1
+        response = web.StreamResponse()
+        response.content_type = f"multipart/x-mixed-replace;boundary={BOUNDARY}"
+        try:
+            await response.prepare(request)
+            while True:
+                part = await queue.get()
+                if part is None:
+                    break
+                self._subscribers[queue] -= len(part)
+                # waits while the viewer's socket buffer is full, frames
+                # arriving meanwhile replace the oldest one in its queue
+                await response.write(part)
+                metrics.bytes_served += len(part)
+        except (asyncio.CancelledError, ConnectionResetError):
+            # Viewer went away
+            pass
+        finally:
+            metrics.active_streams -= 1
+            self._unsubscribe(queue)
+
+        return response
+
+    def _subscribe(self) -> asyncio.Queue:
+        if self._cancel_close is not None:
+            self._cancel_close()
+            self._cancel_close = None
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = 0
+        if self._upstream_task is None or self._upstream_task.done():
+            _LOGGER.debug("Opening shared MJPEG upstream for %s", self._name)
+            self._upstream_task = self._hass.async_create_task(self._async_pump())
+        return queue
+
+    def _unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+        if self._subscribers or self._upstream_task is None:
+            return
+        if self._grace_period > 0:
+            self._cancel_close = async_call_later(
+                self._hass, self._grace_period, self._async_close_idle
+            )
+        else:
+            self._close_upstream()
+
+    async def _async_close_idle(self, _now):
+        self._cancel_close = None
+        if not self._subscribers:
+            self._close_upstream()
+
+    def _close_upstream(self):
+        if self._upstream_task is not None:
+            _LOGGER.debug("Last viewer left, closing MJPEG upstream for %s", self._name)
+            self._upstream_task.cancel()
+            self._upstream_task = None
+
+    def _publish(self, frame: Optional[bytes], buffered: int = 0):
+        """ Queue frame to every viewer and record the stream's buffered bytes.
+
+        buffered is what the parser still holds of the next frame, the peak
+        adds the queue of the most backed up viewer.
+        """
+        part = None
+        if frame is not None:
+            self.latest_frame = frame
+            self.latest_frame_at = monotonic()
+            # encoded once and shared by every viewer
+            part = b"".join(
+                (
+                    b"--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+                    % (BOUNDARY.encode(), len(frame)),
+                    frame,
+                    b"\r\n",
+                )
+            )
+        subscribers = self._subscribers
+        for queue in subscribers:
+            if queue.full():
+                # slow viewer, drop its oldest frame rather than stall the rest
+                dropped = queue.get_nowait()
+                if dropped is not None:
+                    subscribers[queue] -= len(dropped)
+            queue.put_nowait(part)
+            if part is not None:
+                subscribers[queue] += len(part)
+        if subscribers:
+            self._metrics.record_stream_buffer(buffered + max(subscribers.values()))
+
+    async def _async_pump(self):
+        try:
+            await self._async_stream()
+        finally:
+            self._publish(None)
+
+    @abstractmethod
+    async def _async_stream(self):
+        """ Read the upstream and publish every frame until it ends. """
+
+    async def async_close(self):
+        """ Disconnect all viewers and close the upstream. """
+        if self._cancel_close is not None:
+            self._cancel_close()
+            self._cancel_close = None
+        task, self._upstream_task = self._upstream_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+class HttpMjpegHub(MjpegHub):
+    """ MJPEG hub fed by a native multipart stream from the NVR. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        name: str,
+        open_upstream: Callable[[], Awaitable[aiohttp.ClientResponse]],
+        metrics: Optional[MonitorMetrics] = None,
+    ):
+        """ Initialize the hub. """
+        super().__init__(hass, name, metrics=metrics)
+        self._open_upstream = open_upstream
+
+    async def _async_stream(self):
+        try:
+            with self._metrics.operation(OP_MJPEG_CONNECT).measure():
+                response = await self._open_upstream()
+            async with response:
+                response.raise_for_status()
+                boundary = parse_boundary(response.headers.get("Content-Type", ""))
+                parser = (
+                    MultipartFrameParser(boundary) if boundary else JpegFrameParser()
+                )
+                while True:
+                    chunk = await response.content.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    for frame in parser.feed(chunk):
+                        self._publish(frame, parser.buffered)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            _LOGGER.error("Error reading MJPEG stream from %s: %s", self._name, err)
+
+
+class FFmpegMjpegHub(MjpegHub):
+    """ MJPEG hub fed by one ffmpeg transcode of the monitor's stream. """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        name: str,
+        ffmpeg_bin: str,
+        scheduler: FFmpegScheduler,
+        url: str,
+        grace_period: float,
+        metrics: Optional[MonitorMetrics] = None,
+    ):
+        """ Initialize the hub. """
+        super().__init__(hass, name, grace_period, metrics)
+        self._ffmpeg_bin = ffmpeg_bin
+        self._scheduler = scheduler
+        self.url = url
+
+    async def _async_stream(self):
+        async with self._scheduler.slot(PRIORITY_STREAM):
+            await self._async_transcode()
+
+    async def _async_transcode(self):
+        _LOGGER.debug("converting source stream to mjpeg for replay from %s", self._name)
+        stream = CameraMjpeg(self._ffmpeg_bin)
+        if not await stream.open_camera(self.url):
+            _LOGGER.error("Unable to start ffmpeg transcode for %s", self._name)
+            return
+
+        try:
+            reader = await stream.get_reader()
+            parser = MultipartFrameParser(FFMPEG_BOUNDARY)
+            while True:
+                chunk = await reader.read(READ_SIZE)
+                if not chunk:
+                    break
+                for frame in parser.feed(chunk):
+                    self._publish(frame, parser.buffered)
+        finally:
+            _LOGGER.debug("Closing MJPEG stream from %s" % self._name)
+            await stream.close()
@@ -0,0 +1,87 @@
+"""Staggered background prefetching of Shinobi snapshots."""
+import asyncio
+import logging
+from time import monotonic
+from typing import Any, Dict, Optional, Set
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SnapshotPrefetcher:
+    """ Refresh the snapshots of an entry's cameras in the background.
+
+    The scan interval is split into one slot per camera and every slot
+    refreshes the next camera in turn, so the NVR sees a steady trickle
+    instead of a burst. Cameras nobody viewed within idle_timeout are
+    skipped until they are viewed again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        cameras: Dict[str, Any],
+        interval: float,
+        idle_timeout: float,
+        limit: asyncio.Semaphore,
+    ):
+        """ Initialize a stopped prefetcher. """
+        self._hass = hass
+        self._cameras = cameras
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._limit = limit
+        self._position = 0
+        self._pending: Set[str] = set()
+        self._cancel: Optional[CALLBACK_TYPE] = None
+
+    @property
+    def running(self) -> bool:
+        """ Return True while prefetching is scheduled. """
+        return self._cancel is not None
+
+    @callback
+    def async_start(self):
+        """ Start prefetching, if not running already. """
+        if self._cancel is None:
+            self._schedule()
+
+    @callback
+    def async_stop(self):
+        """ Stop scheduling new prefetches. """
+        if self._cancel is not None:
+            self._cancel()
+            self._cancel = None
+
+    def _schedule(self):
+        slot = self.interval / max(1, len(self._cameras))
+        self._cancel = async_call_later(self._hass, slot, self._async_tick)
+
+    @callback
+    def _async_tick(self, _now):
+        self._schedule()
+        cameras = list(self._cameras.items())
+        if not cameras:
+            return
+
+        self._position %= len(cameras)
+        monitor_id, camera = cameras[self._position]
+        self._position += 1
+        if monitor_id in self._pending:
+            # the previous refresh of this camera is still running
+            return
+        if monotonic() - camera.last_viewed > self.idle_timeout:
+            return
+
+        self._pending.add(monitor_id)
+        self._hass.async_create_task(self._async_prefetch(monitor_id, camera))
+
+    async def _async_prefetch(self, monitor_id: str, camera: Any):
+        try:
+            async with self._limit:
+                await camera.async_refresh_snapshot()
+        finally:
+            self._pending.discard(monitor_id)
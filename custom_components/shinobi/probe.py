@@ -0,0 +1,189 @@
+"""Concurrent probing of the streams advertised by Shinobi monitors."""
+import asyncio
+import logging
+import re
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from haffmpeg.core import FFMPEG_STDERR, HAFFmpeg
+
+from .scheduler import PRIORITY_PROBE, FFmpegScheduler, NoSlotAvailable
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_TTL = 60 * 60
+
+_VIDEO_STREAM = re.compile(
+    r"Stream #\d+:\d+.*?: Video: (?P<codec>\w+)[^\n]*?, "
+    r"(?P<width>\d{2,5})x(?P<height>\d{2,5})(?P<rest>[^\n]*)"
+)
+_BITRATE = re.compile(r"(\d+) kb/s")
+# ffmpeg describes its outputs after these, e.g. the null muxer's bitrate
+_OUTPUT_SECTION = re.compile(r"^(?:Stream mapping:|Output #\d+)", re.MULTILINE)
+
+
+class StreamProbe(NamedTuple):
+    url: str
+    reachable: bool
+    latency: Optional[float] = None
+    codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    bitrate: Optional[int] = None
+
+    @property
+    def pixels(self) -> int:
+        """ Return the frame size, 0 when unknown. """
+        return (self.width or 0) * (self.height or 0)
+
+
+def parse_probe(url: str, latency: float, output: str) -> StreamProbe:
+    """ Build a probe result from ffmpeg's description of its input. """
+    output_section = _OUTPUT_SECTION.search(output)
+    if output_section is not None:
+        output = output[: output_section.start()]
+    match = _VIDEO_STREAM.search(output)
+    if match is None:
+        return StreamProbe(url, False, latency)
+    bitrate = _BITRATE.search(match.group("rest")) or _BITRATE.search(output)
+    return StreamProbe(
+        url,
+        True,
+        latency,
+        match.group("codec"),
+        int(match.group("width")),
+        int(match.group("height")),
+        int(bitrate.group(1)) if bitrate else None,
+    )
+
+
+class StreamProber:
+    """ Probe stream urls with bounded concurrency and cache the results. """
+
+    def __init__(
+        self,
+        ffmpeg_bin: str,
+        scheduler: FFmpegScheduler,
+        max_concurrency: int,
+        timeout: float,
+    ):
+        """ Initialize an empty cache. """
+        self._ffmpeg_bin = ffmpeg_bin
+        self._scheduler = scheduler
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._timeout = timeout
+        self._results: Dict[str, StreamProbe] = {}
+        self._probed_at: Dict[str, float] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def get(self, url: str) -> Optional[StreamProbe]:
+        """ Return the cached probe of a url, if any. """
+        return self._results.get(url)
+
+    async def async_probe_all(
+        self, urls: Iterable[str], force: bool = False
+    ) -> List[StreamProbe]:
+        """ Probe every url concurrently, reusing fresh cached results.
+
+        Urls that could not be probed for lack of ffmpeg capacity are left
+        out, they are probed again on the next call.
+        """
+        probes = await asyncio.gather(*[self.async_probe(url, force) for url in urls])
+        return [probe for probe in probes if probe is not None]
+
+    async def async_probe(
+        self, url: str, force: bool = False
+    ) -> Optional[StreamProbe]:
+        """ Probe one url, sharing the result with concurrent callers.
+
+        Returns None without caching anything if no ffmpeg slot frees up
+        within the probe timeout, since that says nothing about the url.
+        """
+        cached = self._results.get(url)
+        if (
+            not force
+            and cached is not None
+            and monotonic() - self._probed_at[url] < PROBE_TTL
+        ):
+            return cached
+
+        pending = self._pending.get(url)
+        if pending is None:
+            pending = self._pending[url] = asyncio.ensure_future(self._async_run(url))
+            pending.add_done_callback(lambda _: self._pending.pop(url, None))
+        return await asyncio.shield(pending)
+
+    async def _async_run(self, url: str) -> Optional[StreamProbe]:
+        async with self._limit:
+            started = perf_counter()
+            try:
+                # long-lived grabbers and transcodes may hold every slot
+                output = await self._scheduler.async_run(
+                    PRIORITY_PROBE,
+                    lambda: self._async_describe(url),
+                    timeout=self._timeout,
+                )
+            except NoSlotAvailable:
+                _LOGGER.debug("No ffmpeg slot free to probe %s", url)
+                return None
+            result = parse_probe(url, perf_counter() - started, output or "")
+
+        _LOGGER.debug("Probed %s: %s", url, result)
+        self._results[url] = result
+        self._probed_at[url] = monotonic()
+        return result
+
+    async def _async_describe(self, url: str) -> Optional[str]:
+        """ Return ffmpeg's stderr after decoding a single frame of url. """
+        ffmpeg = HAFFmpeg(self._ffmpeg_bin)
+        started = await ffmpeg.open(
+            cmd=["-hide_banner", "-an", "-frames:v", "1"],
+            input_source=url,
+            output=None,
+            stdout_pipe=False,
+            stderr_pipe=True,
+        )
+        if not started:
+            return None
+
+        try:
+            reader = await ffmpeg.get_reader(FFMPEG_STDERR)
+            return (await asyncio.wait_for(reader.read(), self._timeout)).decode(
+                errors="replace"
+            )
+        except asyncio.TimeoutError:
+            _LOGGER.debug("Timeout probing %s", url)
+            return None
+        finally:
+            await ffmpeg.close()
+
+
+def pick_stream(
+    streams: Sequence[Any], prober: StreamProber, low_bitrate: bool = False
+) -> Optional[Any]:
+    """ Return the best reachable stream, or the cheapest with low_bitrate.
+
+    Until probes are available the advertised order is kept, and streams
+    known to be unreachable are only used when nothing else is left.
+    """
+    candidates = [
+        stream
+        for stream in streams
+        if getattr(prober.get(stream.url), "reachable", True)
+    ]
+    if not candidates:
+        return streams[0] if streams else None
+
+    probed = [stream for stream in candidates if prober.get(stream.url) is not None]
+    if not probed:
+        return candidates[0]
+
+    def cost(stream):
+        probe = prober.get(stream.url)
+        size = (probe.pixels, probe.bitrate or 0)
+        # the faster stream wins a tie either way
+        return (size if low_bitrate else tuple(-value for value in size)) + (
+            probe.latency,
+        )
+
+    return min(probed, key=cost)
@@ -0,0 +1,232 @@
+"""Incremental, time-indexed index of Shinobi recordings."""
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta
+import logging
+from time import monotonic
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+from homeassistant.core import callback
+from homeassistant.helpers.typing import HomeAssistantType
+import homeassistant.util.dt as dt_util
+import pyshinobicctvapi.errors as ShinobiErrors
+from pyshinobicctvapi.videos import async_all as async_all_videos
+
+from .endpoints import EndpointPool
+
+_LOGGER = logging.getLogger(__name__)
+
+MIN_SYNC_INTERVAL = 30
+# incremental syncs never see deleted videos, a full one drops them
+FULL_SYNC_INTERVAL = 15 * 60
+
+
+class Recording(NamedTuple):
+    start: datetime
+    end: Optional[datetime]
+    monitor_id: str
+    filename: str
+    href: str
+
+    @property
+    def key(self) -> str:
+        """ Return an identifier usable in media source paths. """
+        return self.filename
+
+    @property
+    def mime_type(self) -> str:
+        """ Return the mime type from the file extension. """
+        return "video/webm" if self.filename.endswith(".webm") else "video/mp4"
+
+
+def _value(video: Any, *names: str) -> Any:
+    """ Read the first present attribute or key of a video object. """
+    for name in names:
+        value = (
+            video.get(name) if isinstance(video, dict) else getattr(video, name, None)
+        )
+        if value is not None:
+            return value
+    return None
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return dt_util.as_utc(value)
+    if isinstance(value, str):
+        parsed = dt_util.parse_datetime(value)
+        return dt_util.as_utc(parsed) if parsed is not None else None
+    return None
+
+
+def _recording(video: Any) -> Optional[Recording]:
+    start = _as_datetime(_value(video, "time", "start"))
+    monitor_id = _value(video, "monitor_id", "mid")
+    filename = _value(video, "filename")
+    href = _value(video, "href", "url")
+    if start is None or monitor_id is None or filename is None or href is None:
+        return None
+    return Recording(
+        start, _as_datetime(_value(video, "end")), monitor_id, filename, href
+    )
+
+
+class _MonitorRecordings:
+    """ Recordings of one monitor sorted by start time. """
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.recordings: List[Recording] = []
+        self.keys: Dict[str, Recording] = {}
+        self.days: Counter = Counter()
+
+    def add(self, recording: Recording):
+        if recording.key in self.keys:
+            return
+        # new videos nearly always land at the end, keeping inserts cheap
+        index = bisect_right(self.starts, recording.start)
+        self.starts.insert(index, recording.start)
+        self.recordings.insert(index, recording)
+        self.keys[recording.key] = recording
+        self.days[dt_util.as_local(recording.start).date()] += 1
+
+    def day(self, day: date, offset: int, limit: int) -> List[Recording]:
+        """ Return a page of a local day's recordings, newest first. """
+        start = dt_util.as_utc(dt_util.start_of_local_day(day))
+        lower = bisect_left(self.starts, start)
+        upper = bisect_left(self.starts, start + timedelta(days=1))
+        newest = upper - offset
+        return self.recordings[max(lower, newest - limit) : max(lower, newest)][::-1]
+
+
+def _add_videos(
+    monitors: Dict[str, _MonitorRecordings], videos: Optional[List[Any]]
+) -> Tuple[int, Optional[datetime]]:
+    """ Add videos to monitors, returning how many and the newest start. """
+    added = 0
+    newest = None
+    for video in videos or ():
+        recording = _recording(video)
+        if recording is None:
+            continue
+        monitors.setdefault(recording.monitor_id, _MonitorRecordings()).add(recording)
+        if newest is None or recording.start > newest:
+            newest = recording.start
+        added += 1
+    return added, newest
+
+
+class RecordingIndex:
+    """ In-memory index of an entry's recordings, synced incrementally.
+
+    Videos the NVR removed, e.g. by its retention, are dropped by a full
+    rebuild every FULL_SYNC_INTERVAL. It runs in the background while the
+    current index keeps serving browse requests.
+    """
+
+    def __init__(self, hass: HomeAssistantType, endpoints: EndpointPool):
+        """ Initialize an empty index. """
+        self._hass = hass
+        self._endpoints = endpoints
+        self._monitors: Dict[str, _MonitorRecordings] = {}
+        self._synced_until: Optional[datetime] = None
+        self._last_sync = 0.0
+        self._last_full_sync = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def async_sync(self, force: bool = False):
+        """ Fetch the recordings newer than the last sync, all on the first. """
+        async with self._lock:
+            now = monotonic()
+            if not force and now - self._last_sync < MIN_SYNC_INTERVAL:
+                return
+
+            since = self._synced_until
+            videos = await self._async_list(since)
+            if videos is None:
+                return
+
+            added, newest = _add_videos(self._monitors, videos)
+            if newest is not None and (since is None or newest > since):
+                self._synced_until = newest
+            self._last_sync = monotonic()
+            if since is None:
+                self._last_full_sync = self._last_sync
+            _LOGGER.debug("Synced %d recordings since %s", added, since)
+
+        if (
+            self._rebuild_task is None
+            and monotonic() - self._last_full_sync >= FULL_SYNC_INTERVAL
+        ):
+            self._rebuild_task = self._hass.async_create_task(self._async_rebuild())
+
+    async def _async_rebuild(self):
+        """ Build a new index from a full listing and swap it in. """
+        try:
+            videos = await self._async_list(None)
+            if videos is None:
+                return
+
+            monitors: Dict[str, _MonitorRecordings] = {}
+            added, newest = _add_videos(monitors, videos)
+            async with self._lock:
+                # keep what incremental syncs added while the listing ran
+                for monitor in self._monitors.values():
+                    for recording in monitor.recordings:
+                        if newest is None or recording.start > newest:
+                            monitors.setdefault(
+                                recording.monitor_id, _MonitorRecordings()
+                            ).add(recording)
+                if self._synced_until is not None and (
+                    newest is None or self._synced_until > newest
+                ):
+                    newest = self._synced_until
+                self._monitors = monitors
+                self._synced_until = newest
+                self._last_full_sync = monotonic()
+            _LOGGER.debug("Rebuilt the index from %d recordings", added)
+        finally:
+            self._rebuild_task = None
+
+    async def _async_list(self, since: Optional[datetime]) -> Optional[List[Any]]:
+        """ Return the videos started since, None if the NVR failed. """
+        kwargs = {"start": since} if since is not None else {}
+        try:
+            return await self._endpoints.async_request(
+                lambda endpoint: async_all_videos(endpoint.connection, **kwargs)
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ShinobiErrors.Error) as err:
+            _LOGGER.warning("Unable to sync recordings: %s", err)
+            return None
+
+    @callback
+    def async_stop(self):
+        """ Cancel a rebuild in progress. """
+        if self._rebuild_task is not None:
+            self._rebuild_task.cancel()
+            self._rebuild_task = None
+
+    def days(self, monitor_id: str) -> List[date]:
+        """ Return the local days with recordings, newest first. """
+        monitor = self._monitors.get(monitor_id)
+        return sorted(monitor.days, reverse=True) if monitor is not None else []
+
+    def count(self, monitor_id: str, day: date) -> int:
+        """ Return the number of recordings of a monitor on a local day. """
+        monitor = self._monitors.get(monitor_id)
+        return monitor.days.get(day, 0) if monitor is not None else 0
+
+    def day(
+        self, monitor_id: str, day: date, offset: int, limit: int
+    ) -> List[Recording]:
+        """ Return a page of recordings of a monitor on a local day. """
+        monitor = self._monitors.get(monitor_id)
+        return monitor.day(day, offset, limit) if monitor is not None else []
+
+    def get(self, monitor_id: str, key: str) -> Optional[Recording]:
+        """ Return a single recording. """
+        monitor = self._monitors.get(monitor_id)
+        return monitor.keys.get(key) if monitor is not None else None
@@ -0,0 +1,34 @@
+"""Downscaling of Shinobi snapshots for dashboard tiles."""
+from bisect import bisect_left
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+SIZE_BUCKETS = (160, 320, 640, 960, 1280, 1920)
+JPEG_QUALITY = 80
+
+
+def size_bucket(width: Optional[int], height: Optional[int]) -> Optional[int]:
+    """ Round a requested size up to a bucket width, None for full size. """
+    if not width and not height:
+        return None
+    # without a width assume the usual 16:9 frame
+    target = width or int(height * 16 / 9)
+    index = bisect_left(SIZE_BUCKETS, target)
+    return SIZE_BUCKETS[index] if index < len(SIZE_BUCKETS) else None
+
+
+def scale_jpeg(image: bytes, width: int) -> bytes:
+    """ Downscale a JPEG to at most width pixels wide, run in an executor. """
+    with Image.open(BytesIO(image)) as source:
+        if source.width <= width:
+            return image
+        height = max(1, round(source.height * width / source.width))
+        # let the decoder skip DCT coefficients instead of decoding full size
+        source.draft("RGB", (width, height))
+        scaled = source.convert("RGB").resize((width, height), Image.BILINEAR)
+
+    output = BytesIO()
+    scaled.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=False)
+    return output.getvalue()
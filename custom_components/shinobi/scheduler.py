@@ -0,0 +1,156 @@
+"""Global scheduling of ffmpeg processes across all Shinobi entries."""
+import asyncio
+from contextlib import asynccontextmanager
+import heapq
+from itertools import count
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .metrics import OperationStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# lower runs first
+PRIORITY_STREAM = 0
+PRIORITY_STILL = 1
+PRIORITY_PROBE = 2
+PRIORITY_THUMBNAIL = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_STREAM: "stream",
+    PRIORITY_STILL: "still",
+    PRIORITY_PROBE: "probe",
+    PRIORITY_THUMBNAIL: "thumbnail",
+}
+
+
+class NoSlotAvailable(asyncio.TimeoutError):
+    """ No slot freed up in time, a local limit rather than a failed stream. """
+
+
+class FFmpegScheduler:
+    """ Cap the number of ffmpeg processes, queueing the rest by priority.
+
+    Short jobs run through async_run and identical pending jobs share one
+    process. Long-lived processes such as transcodes hold a slot for as long
+    as they run, through slot() or async_acquire() and release().
+    """
+
+    def __init__(self, max_concurrency: int):
+        """ Initialize an idle scheduler. """
+        self.max_concurrency = max_concurrency
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = count()
+        self._jobs: Dict[Hashable, asyncio.Future] = {}
+        self.wait_stats: Dict[int, OperationStats] = {
+            priority: OperationStats() for priority in PRIORITY_NAMES
+        }
+
+    @property
+    def active(self) -> int:
+        """ Return the number of slots in use. """
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        """ Return the number of requests waiting for a slot. """
+        return self._queued
+
+    async def async_acquire(self, priority: int, timeout: Optional[float] = None):
+        """ Wait for a free slot, the caller must release() it.
+
+        Raises NoSlotAvailable if no slot frees up within timeout.
+        """
+        try:
+            await asyncio.wait_for(self._async_acquire(priority), timeout)
+        except NoSlotAvailable:
+            raise
+        except asyncio.TimeoutError:
+            raise NoSlotAvailable(f"No ffmpeg slot free within {timeout}s") from None
+
+    async def _async_acquire(self, priority: int):
+        with self.wait_stats[priority].measure():
+            if self._active < self.max_concurrency and not self._queued:
+                self._active += 1
+                return
+
+            waiter = asyncio.get_event_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+            self._queued += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the slot was handed over just before the cancellation
+                    self.release()
+                else:
+                    self._queued -= 1
+                raise
+
+    def release(self):
+        """ Hand the slot to the most urgent waiter, or free it. """
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._queued -= 1
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        """ Hold a slot for the duration of the block. """
+        await self.async_acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def async_run(
+        self,
+        priority: int,
+        job: Callable[[], Awaitable[Any]],
+        key: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """ Run job in a slot, sharing the result with pending jobs of the same key.
+
+        The job is shielded from the caller's cancellation so an ffmpeg
+        process is never killed halfway by a viewer going away. Raises
+        NoSlotAvailable if no slot frees up within timeout.
+        """
+        pending = self._jobs.get(key) if key is not None else None
+        if pending is None:
+            pending = asyncio.ensure_future(
+                self._async_run_job(priority, job, timeout)
+            )
+            if key is not None:
+                self._jobs[key] = pending
+                pending.add_done_callback(lambda _: self._jobs.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _async_run_job(
+        self,
+        priority: int,
+        job: Callable[[], Awaitable[Any]],
+        timeout: Optional[float],
+    ) -> Any:
+        await self.async_acquire(priority, timeout)
+        try:
+            return await job()
+        finally:
+            self.release()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "wait": {
+                PRIORITY_NAMES[priority]: stats.as_dict()
+                for priority, stats in self.wait_stats.items()
+            },
+        }
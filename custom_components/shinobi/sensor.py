@@ -0,0 +1,125 @@
+"""Shinobi diagnostic sensors for Home Assistant"""
+from datetime import timedelta
+import logging
+from typing import Callable, NamedTuple, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.typing import HomeAssistantType
+from pyshinobicctvapi.monitors import Monitor
+
+from .entity import EntityMixin as ShinobiEntityMixin, async_add_monitor_entities
+from .metrics import OP_CAMERA_IMAGE, MonitorMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+def _latency_ms(metrics: MonitorMetrics) -> Optional[float]:
+    stats = metrics.operations.get(OP_CAMERA_IMAGE)
+    latency = stats.percentile(95) if stats is not None else None
+    return round(latency * 1000, 1) if latency is not None else None
+
+
+class MetricDescription(NamedTuple):
+    key: str
+    name: str
+    unit: Optional[str]
+    icon: str
+    value: Callable[[MonitorMetrics], Optional[float]]
+
+
+METRICS = (
+    MetricDescription(
+        "image_latency", "Image Latency p95", "ms", "mdi:timer-outline", _latency_ms
+    ),
+    MetricDescription(
+        "errors", "Errors", None, "mdi:alert-circle-outline", lambda m: m.errors
+    ),
+    MetricDescription(
+        "bytes_served",
+        "Data Served",
+        "MiB",
+        "mdi:download-network-outline",
+        lambda m: round(m.bytes_served / (1024 * 1024), 2),
+    ),
+    MetricDescription(
+        "active_streams",
+        "Active Streams",
+        None,
+        "mdi:play-network-outline",
+        lambda m: m.active_streams,
+    ),
+    MetricDescription(
+        "stream_buffer_peak",
+        "Stream Buffer Peak",
+        "KiB",
+        "mdi:memory",
+        lambda m: round(m.stream_buffer_peak / 1024, 1),
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Add diagnostic sensors for Shinobi"""
+
+    async_add_monitor_entities(
+        hass,
+        entry,
+        async_add_entities,
+        lambda monitor: [
+            ShinobiMetricSensor(entry.entry_id, monitor, description)
+            for description in METRICS
+        ],
+    )
+
+
+class ShinobiMetricSensor(ShinobiEntityMixin[Monitor], Entity):
+    """ A per-monitor performance metric. """
+
+    def __init__(
+        self, config_entry_id: str, monitor: Monitor, description: MetricDescription
+    ):
+        """ Initialize the sensor. """
+        super().__init__(config_entry_id, monitor)
+        self._description = description
+
+    @property
+    def name(self):
+        """ Return the name of this sensor. """
+        return f"{self._device.name} {self._description.name}"
+
+    @property
+    def unique_id(self):
+        """ Return as unique id. """
+        return f"{self._device.id}_{self._description.key}"
+
+    @property
+    def should_poll(self):
+        """ Metrics change constantly, read them on the scan interval. """
+        return True
+
+    @property
+    def entity_registry_enabled_default(self):
+        """ Diagnostics are opt-in. """
+        return False
+
+    @property
+    def icon(self):
+        """ Return the icon of this sensor. """
+        return self._description.icon
+
+    @property
+    def unit_of_measurement(self):
+        """ Return the unit of this sensor. """
+        return self._description.unit
+
+    @property
+    def state(self):
+        """ Return the current metric value. """
+        return self._description.value(
+            self.shinobi_objects["metrics"].monitor(self._device.id)
+        )
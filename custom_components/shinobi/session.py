@@ -0,0 +1,45 @@
+"""Connection pools owned by a Shinobi config entry."""
+import asyncio
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .const import KEEPALIVE_TIMEOUT
+
+
+def _create_session(limit: int) -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        ),
+        headers={"User-Agent": SERVER_SOFTWARE},
+    )
+
+
+class ShinobiSessions:
+    """ Separate pools for short API/snapshot calls and long-lived streams. """
+
+    def __init__(self, hass: HomeAssistantType, api_limit: int, stream_limit: int):
+        """ Create the connection pools of a config entry. """
+        self.api = _create_session(api_limit)
+        self.stream = _create_session(stream_limit)
+        # entries that are never unloaded still release their sockets on shutdown
+        self._remove_close_listener = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, self._async_close_on_stop
+        )
+
+    async def _async_close_on_stop(self, _event):
+        self._remove_close_listener = None
+        await self.async_close()
+
+    async def async_close(self):
+        """ Close both pools. """
+        if self._remove_close_listener is not None:
+            self._remove_close_listener()
+            self._remove_close_listener = None
+        await asyncio.gather(self.api.close(), self.stream.close())
@@ -0,0 +1,51 @@
+"""Signed, expiring urls for the Shinobi views."""
+from datetime import timedelta
+import logging
+
+from homeassistant.auth.const import GROUP_ID_READ_ONLY
+from homeassistant.components.http.auth import async_sign_path
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .const import DATA_SIGNING_TOKEN, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.auth"
+STORAGE_VERSION = 1
+SYSTEM_USER_NAME = "Shinobi"
+
+# browse results are fetched again whenever the frontend opens a folder
+LINK_TTL = timedelta(hours=1)
+
+
+async def async_setup_signing(hass: HomeAssistantType):
+    """ Load or create the read-only system user urls are signed for.
+
+    Thumbnails in browse results and urls inside proxied playlists are
+    fetched by the browser without auth headers and without a signature
+    from the frontend, so they are signed on behalf of this user.
+    """
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    data = await store.async_load() or {}
+    user = None
+    if "user_id" in data:
+        user = await hass.auth.async_get_user(data["user_id"])
+    if user is None:
+        _LOGGER.debug("Creating the %s system user for signed urls", SYSTEM_USER_NAME)
+        user = await hass.auth.async_create_system_user(
+            SYSTEM_USER_NAME, group_ids=[GROUP_ID_READ_ONLY]
+        )
+        await store.async_save({"user_id": user.id})
+
+    refresh_token = next(iter(user.refresh_tokens.values()), None)
+    if refresh_token is None:
+        refresh_token = await hass.auth.async_create_refresh_token(user)
+    hass.data[DATA_SIGNING_TOKEN] = refresh_token.id
+
+
+@callback
+def sign_path(hass: HomeAssistantType, path: str, expiration: timedelta) -> str:
+    """ Return path with a signature that expires after expiration. """
+    return async_sign_path(hass, hass.data[DATA_SIGNING_TOKEN], path, expiration)
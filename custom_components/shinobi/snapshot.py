@@ -0,0 +1,112 @@
+"""Snapshot cache shared by all Shinobi cameras."""
+import asyncio
+from collections import OrderedDict
+import logging
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _CachedImage(NamedTuple):
+    image: bytes
+    fetched: float
+
+
+class SnapshotCache:
+    """ LRU cache of snapshots with single-flight fetches and a byte budget. """
+
+    def __init__(self, max_bytes: int):
+        """ Initialize the cache. """
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._images: "OrderedDict[Hashable, _CachedImage]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def size(self) -> int:
+        """ Return the number of bytes held by the cache. """
+        return self._size
+
+    async def async_get(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Optional[bytes]]],
+        not_before: Optional[float] = None,
+    ) -> Optional[bytes]:
+        """ Return a fresh image, fetching it at most once for all callers.
+
+        Images cached before not_before are stale regardless of ttl, which
+        ties images derived from another entry to that entry's fetched_at.
+        The fetch callable returns None on failure, in which case the last
+        cached image, however old, is returned instead.
+        """
+        cached = self._images.get(key)
+        if (
+            cached is not None
+            and monotonic() - cached.fetched < ttl
+            and (not_before is None or cached.fetched >= not_before)
+        ):
+            self._images.move_to_end(key)
+            return cached.image
+
+        image = await self.async_refresh(key, fetch)
+        return image if image is not None else self.peek(key)
+
+    async def async_refresh(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[bytes]]]
+    ) -> Optional[bytes]:
+        """ Fetch a new image regardless of its age, None on failure.
+
+        Joins a fetch already in flight for key, so a refresh never runs
+        next to the fetch of a viewer.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._async_fetch(key, fetch))
+            self._inflight[key] = inflight
+
+        # shield so one cancelled caller does not abort the fetch for the rest
+        return await asyncio.shield(inflight)
+
+    async def _async_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[bytes]]]
+    ) -> Optional[bytes]:
+        try:
+            image = await fetch()
+        finally:
+            self._inflight.pop(key, None)
+
+        if image is not None:
+            self.put(key, image)
+        return image
+
+    def fetched_at(self, key: Hashable) -> Optional[float]:
+        """ Return the monotonic time the cached image was stored, if any. """
+        cached = self._images.get(key)
+        return cached.fetched if cached is not None else None
+
+    def peek(self, key: Hashable) -> Optional[bytes]:
+        """ Return the cached image regardless of its age. """
+        cached = self._images.get(key)
+        return cached.image if cached is not None else None
+
+    def put(self, key: Hashable, image: bytes):
+        """ Store an image, evicting the least recently used ones if needed. """
+        self.discard(key)
+        if len(image) > self._max_bytes:
+            _LOGGER.debug("Snapshot for %s exceeds cache budget, not cached", key)
+            return
+
+        self._images[key] = _CachedImage(image, monotonic())
+        self._size += len(image)
+        while self._size > self._max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._size -= len(evicted.image)
+
+    def discard(self, key: Hashable):
+        """ Remove an image from the cache. """
+        cached = self._images.pop(key, None)
+        if cached is not None:
+            self._size -= len(cached.image)
@@ -0,0 +1,113 @@
+"""Cost based selection between the still image sources of a monitor."""
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
+
+SOURCE_JPEG_API = "jpeg_api"
+SOURCE_MJPEG_FRAME = "mjpeg_frame"
+SOURCE_FFMPEG = "ffmpeg"
+
+# weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+UNHEALTHY_SUCCESS_RATE = 0.5
+UNHEALTHY_FAILURES = 3
+RETRY_MIN = 30
+RETRY_MAX = 600
+REEVALUATE_INTERVAL = 300
+
+
+class _SourceHealth:
+    """ Moving averages of one still source's latency and success rate. """
+
+    __slots__ = ("latency", "success", "failures", "retry_at", "last_tried")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.success = 1.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_tried = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return (
+            self.failures < UNHEALTHY_FAILURES
+            or self.success >= UNHEALTHY_SUCCESS_RATE
+            or monotonic() >= self.retry_at
+        )
+
+
+class StillStrategy:
+    """ Route still requests to the cheapest healthy source.
+
+    Every source is measured as it is used; sources that have never been
+    measured are tried first, and every REEVALUATE_INTERVAL the least
+    recently tried alternative gets one request so a source that became
+    cheaper is noticed.
+    """
+
+    def __init__(self, sources: Iterable[str] = ()):
+        self._health: Dict[str, _SourceHealth] = {}
+        self._last_reevaluation = monotonic()
+        self.update_sources(sources)
+
+    def update_sources(self, sources: Iterable[str]):
+        """ Change the available sources, keeping what was measured. """
+        self._health = {
+            source: self._health.get(source) or _SourceHealth() for source in sources
+        }
+
+    def candidates(self) -> List[str]:
+        """ Return the sources to try, in order, for the next request. """
+        healthy = [source for source, health in self._health.items() if health.healthy]
+        unhealthy = [source for source in self._health if source not in healthy]
+        ordered = sorted(healthy, key=self._cost)
+
+        now = monotonic()
+        if len(ordered) > 1 and now - self._last_reevaluation >= REEVALUATE_INTERVAL:
+            self._last_reevaluation = now
+            probe = min(ordered[1:], key=lambda source: self._health[source].last_tried)
+            ordered.remove(probe)
+            ordered.insert(0, probe)
+
+        # unhealthy sources are still a last resort rather than no image at all
+        return ordered + unhealthy
+
+    def _cost(self, source: str) -> float:
+        health = self._health[source]
+        if health.latency is None:
+            return -1.0
+        # a flaky source costs a retry on top of its latency
+        return health.latency / max(health.success, 0.05)
+
+    def record(self, source: str, latency: float, success: bool):
+        """ Record the outcome of a request to a source. """
+        health = self._health.get(source)
+        if health is None:
+            return
+        health.last_tried = monotonic()
+        health.success += EWMA_ALPHA * ((1.0 if success else 0.0) - health.success)
+        if success:
+            health.failures = 0
+            health.latency = (
+                latency
+                if health.latency is None
+                else health.latency + EWMA_ALPHA * (latency - health.latency)
+            )
+            return
+
+        health.failures += 1
+        if health.failures >= UNHEALTHY_FAILURES:
+            backoff = RETRY_MIN * 2 ** (health.failures - UNHEALTHY_FAILURES)
+            health.retry_at = health.last_tried + min(backoff, RETRY_MAX)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return a diagnostics friendly representation. """
+        return {
+            source: {
+                "latency": health.latency,
+                "success": round(health.success, 3),
+                "failures": health.failures,
+                "healthy": health.healthy,
+            }
+            for source, health in self._health.items()
+        }
@@ -0,0 +1,58 @@
+"""Helpers shared by the Shinobi integration."""
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+READ_SIZE = 64 * 1024
+
+
+class BodyTooLarge(aiohttp.ClientPayloadError):
+    """ A response body is larger than the caller accepts. """
+
+
+def base_url(host: str, port: Optional[int]) -> str:
+    """ Return the http(s) base url of a Shinobi server. """
+    if "://" not in host:
+        host = f"http://{host}"
+    parts = urlsplit(host)
+    netloc = parts.hostname or ""
+    if port:
+        netloc = f"{netloc}:{port}"
+    elif parts.port:
+        netloc = f"{netloc}:{parts.port}"
+    return f"{parts.scheme}://{netloc}"
+
+
+async def async_read_body(response: aiohttp.ClientResponse, limit: int) -> bytearray:
+    """ Read a response body of at most limit bytes.
+
+    When the server sends a Content-Length the buffer is allocated once at
+    that size and filled in place, otherwise it grows chunk by chunk until
+    the limit. Raises BodyTooLarge past the limit.
+    """
+    length = response.content_length
+    if length is None:
+        body = bytearray()
+        while True:
+            chunk = await response.content.read(READ_SIZE)
+            if not chunk:
+                return body
+            if len(body) + len(chunk) > limit:
+                raise BodyTooLarge(f"Body of {response.url} exceeds {limit} bytes")
+            body += chunk
+
+    if length > limit:
+        raise BodyTooLarge(f"Body of {response.url} is {length} bytes, over {limit}")
+    body = bytearray(length)
+    with memoryview(body) as view:
+        filled = 0
+        while filled < length:
+            chunk = await response.content.read(length - filled)
+            if not chunk:
+                raise aiohttp.ClientPayloadError(
+                    f"Body of {response.url} ended after {filled} of {length} bytes"
+                )
+            view[filled : filled + len(chunk)] = chunk
+            filled += len(chunk)
+    return body
@@ -0,0 +1,318 @@
+"""HTTP views of the Shinobi integration."""
+import asyncio
+import logging
+
+import aiohttp
+from aiohttp import web
+import async_timeout
+from haffmpeg.tools import IMAGE_JPEG, ImageFrame
+from homeassistant.components.ffmpeg import DATA_FFMPEG
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.http.const import KEY_AUTHENTICATED
+
+from .const import (
+    CAMERA_WEB_SESSION_TIMEOUT,
+    CONF_HLS_PASSTHROUGH,
+    DATA_FFMPEG_SCHEDULER,
+    DATA_HLS_CACHE,
+    DATA_SNAPSHOT_CACHE,
+    DEFAULT_HLS_PASSTHROUGH,
+    DOMAIN,
+)
+from .hls import (
+    MASTER_PLAYLIST,
+    MAX_FILE_SIZE,
+    PLAYLIST_TTL,
+    SEGMENT_TTL,
+    content_type,
+    is_playlist,
+    link_ttl,
+    master_playlist,
+    rewrite_playlist,
+)
+from .metrics import OP_HLS_UPSTREAM
+from .scheduler import PRIORITY_THUMBNAIL, NoSlotAvailable
+from .signing import sign_path
+from .util import READ_SIZE, async_read_body
+
+_LOGGER = logging.getLogger(__name__)
+
+THUMBNAIL_TTL = 24 * 60 * 60
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_RETRY_AFTER = 5
+# passed through so players can seek with range requests
+RECORDING_REQUEST_HEADERS = ("Range", "If-Range")
+RECORDING_RESPONSE_HEADERS = (
+    "Accept-Ranges",
+    "Content-Length",
+    "Content-Range",
+    "Content-Type",
+    "Last-Modified",
+)
+
+
+def _entry_info(request: web.Request, entry_id: str) -> dict:
+    """ Return the entry's objects, 404 if the entry is not loaded. """
+    info = request.app["hass"].data.get(DOMAIN, {}).get(entry_id)
+    if info is None:
+        raise web.HTTPNotFound()
+    return info
+
+
+class ShinobiSnapshotView(HomeAssistantView):
+    """ Serve camera snapshots downscaled for dashboard tiles.
+
+    Core's camera proxy only passes the requested size on from HA 2021.9,
+    this view takes width and height query parameters on every version.
+    Like the camera proxy, it accepts the camera's access token instead of
+    auth headers, so the url works in image tags.
+    """
+
+    url = "/api/shinobi/snapshot/{entity_id}"
+    name = "api:shinobi:snapshot"
+    requires_auth = False
+
+    async def get(self, request: web.Request, entity_id: str) -> web.Response:
+        """ Return a snapshot, scaled to the size bucket of width or height. """
+        camera = next(
+            (
+                camera
+                for info in request.app["hass"].data.get(DOMAIN, {}).values()
+                for camera in info["cameras"].values()
+                if camera.entity_id == entity_id
+            ),
+            None,
+        )
+        if camera is None:
+            raise web.HTTPNotFound()
+        if (
+            not request[KEY_AUTHENTICATED]
+            and request.query.get("token") not in camera.access_tokens
+        ):
+            raise web.HTTPUnauthorized()
+
+        try:
+            width, height = (
+                int(request.query[name]) if name in request.query else None
+                for name in ("width", "height")
+            )
+        except ValueError:
+            raise web.HTTPBadRequest()
+
+        image = await camera.async_camera_image(width, height)
+        if image is None:
+            raise web.HTTPServiceUnavailable()
+        return web.Response(body=image, content_type="image/jpeg")
+
+
+class ShinobiThumbnailView(HomeAssistantView):
+    """ Serve recording thumbnails, generated on first request. """
+
+    url = "/api/shinobi/thumbnail/{entry_id}/{monitor_id}/{key}"
+    name = "api:shinobi:thumbnail"
+    # image tags send no auth headers, browse results link signed paths instead
+
+    async def get(
+        self, request: web.Request, entry_id: str, monitor_id: str, key: str
+    ) -> web.Response:
+        """ Return the thumbnail of a recording. """
+        hass = request.app["hass"]
+        info = _entry_info(request, entry_id)
+
+        recording = info["recordings"].get(monitor_id, key)
+        if recording is None:
+            raise web.HTTPNotFound()
+
+        async def generate():
+            ffmpeg = ImageFrame(hass.data[DATA_FFMPEG].binary)
+            url = info["endpoints"].best.base_url + recording.href
+            return await hass.data[DATA_FFMPEG_SCHEDULER].async_run(
+                PRIORITY_THUMBNAIL,
+                lambda: ffmpeg.get_image(
+                    url,
+                    output_format=IMAGE_JPEG,
+                    extra_cmd=f"-vf scale={THUMBNAIL_WIDTH}:-1",
+                ),
+                key=("thumbnail", url),
+                timeout=CAMERA_WEB_SESSION_TIMEOUT,
+            )
+
+        try:
+            image = await hass.data[DATA_SNAPSHOT_CACHE].async_get(
+                ("thumbnail", entry_id, monitor_id, key), THUMBNAIL_TTL, generate
+            )
+        except NoSlotAvailable:
+            # busy with streams, the browser may ask again later
+            raise web.HTTPServiceUnavailable(
+                headers={"Retry-After": str(THUMBNAIL_RETRY_AFTER)}
+            )
+        if image is None:
+            raise web.HTTPNotFound()
+
+        return web.Response(
+            body=image,
+            content_type="image/jpeg",
+            headers={"Cache-Control": f"private, max-age={THUMBNAIL_TTL}"},
+        )
+
+
+class ShinobiRecordingView(HomeAssistantView):
+    """ Stream recordings from the NVR, keeping its API key server side. """
+
+    url = "/api/shinobi/recording/{entry_id}/{monitor_id}/{key}"
+    name = "api:shinobi:recording"
+
+    async def get(
+        self, request: web.Request, entry_id: str, monitor_id: str, key: str
+    ) -> web.StreamResponse:
+        """ Proxy a recording, forwarding range requests. """
+        info = _entry_info(request, entry_id)
+        recording = info["recordings"].get(monitor_id, key)
+        if recording is None:
+            raise web.HTTPNotFound()
+
+        endpoints = info["endpoints"]
+        url = endpoints.primary.base_url + recording.href
+        headers = {
+            name: request.headers[name]
+            for name in RECORDING_REQUEST_HEADERS
+            if name in request.headers
+        }
+
+        async def connect(endpoint):
+            upstream = await info["sessions"].stream.get(
+                endpoints.rebase(url, endpoint),
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=CAMERA_WEB_SESSION_TIMEOUT,
+                    sock_read=CAMERA_WEB_SESSION_TIMEOUT,
+                ),
+            )
+            if upstream.status >= 500:
+                upstream.release()
+                upstream.raise_for_status()
+            return upstream
+
+        try:
+            upstream = await endpoints.async_request(connect, monitor_id)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            _LOGGER.debug("Unable to open recording %s: %s", key, err)
+            raise web.HTTPBadGateway()
+
+        metrics = info["metrics"].monitor(monitor_id)
+        response = web.StreamResponse(
+            status=upstream.status,
+            headers={
+                name: upstream.headers[name]
+                for name in RECORDING_RESPONSE_HEADERS
+                if name in upstream.headers
+            },
+        )
+        try:
+            await response.prepare(request)
+            async for chunk in upstream.content.iter_chunked(READ_SIZE):
+                await response.write(chunk)
+                metrics.bytes_served += len(chunk)
+        except (asyncio.CancelledError, ConnectionResetError):
+            # Viewer went away or seeked elsewhere
+            pass
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            _LOGGER.debug("Recording %s ended early: %s", key, err)
+        finally:
+            upstream.release()
+        return response
+
+
+class ShinobiHlsView(HomeAssistantView):
+    """ Proxy a monitor's own HLS stream, sharing fetches between viewers.
+
+    Playlists are cached for PLAYLIST_TTL and rewritten to point back at
+    this view, segments are cached for SEGMENT_TTL, so concurrent viewers
+    cost one upstream request per playlist refresh and per segment.
+
+    hls.js sends no auth headers, so the links inside playlists are signed.
+    Players start from MASTER_PLAYLIST, whose short lived link is signed by
+    media source, and reload the monitor's playlist through a link that
+    stays valid for PLAYLIST_LINK_TTL.
+    """
+
+    url = "/api/shinobi/hls/{entry_id}/{monitor_id}/{name}"
+    name = "api:shinobi:hls"
+
+    async def get(
+        self, request: web.Request, entry_id: str, monitor_id: str, name: str
+    ) -> web.Response:
+        """ Return a playlist or segment of a monitor's HLS stream. """
+        hass = request.app["hass"]
+        info = _entry_info(request, entry_id)
+        entry = hass.config_entries.async_get_entry(entry_id)
+        camera = info["cameras"].get(monitor_id)
+        upstream = camera.hls_source_url if camera is not None else None
+        media_type = content_type(name)
+        if (
+            not entry.options.get(CONF_HLS_PASSTHROUGH, DEFAULT_HLS_PASSTHROUGH)
+            or upstream is None
+            or media_type is None
+            or name.startswith(".")
+        ):
+            raise web.HTTPNotFound()
+
+        directory, source = upstream.split("?", 1)[0].rsplit("/", 1)
+        prefix = f"/api/shinobi/hls/{entry_id}/{monitor_id}/"
+
+        def link(file: str) -> str:
+            # relative to the playlist, signed for the system user so the
+            # rewritten playlists can be shared between viewers
+            return sign_path(hass, prefix + file, link_ttl(file))[len(prefix) :]
+
+        if name == MASTER_PLAYLIST:
+            return web.Response(
+                body=master_playlist(link(source)),
+                content_type=media_type,
+                headers={"Cache-Control": "no-cache"},
+            )
+
+        url = f"{directory}/{name}"
+        playlist = is_playlist(name)
+        metrics = info["metrics"].monitor(monitor_id)
+
+        endpoints = info["endpoints"]
+
+        async def fetch_from(endpoint):
+            with async_timeout.timeout(CAMERA_WEB_SESSION_TIMEOUT):
+                async with info["sessions"].api.get(
+                    endpoints.rebase(url, endpoint)
+                ) as response:
+                    response.raise_for_status()
+                    return await async_read_body(response, MAX_FILE_SIZE)
+
+        async def fetch():
+            try:
+                with metrics.operation(OP_HLS_UPSTREAM).measure():
+                    # segments come from the node that served the playlist
+                    body = await endpoints.async_request(fetch_from, monitor_id)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+                _LOGGER.debug("Unable to fetch %s of %s: %s", name, monitor_id, err)
+                return None
+            if playlist:
+                body = rewrite_playlist(body, url, link)
+            return body
+
+        body = await hass.data[DATA_HLS_CACHE].async_get(
+            (entry_id, monitor_id, name),
+            PLAYLIST_TTL if playlist else SEGMENT_TTL,
+            fetch,
+        )
+        if body is None:
+            raise web.HTTPBadGateway()
+
+        metrics.bytes_served += len(body)
+        return web.Response(
+            body=body,
+            content_type=media_type,
+            headers={
+                "Cache-Control": "no-cache"
+                if playlist
+                else f"private, max-age={SEGMENT_TTL}"
+            },
+        )
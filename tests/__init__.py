@@ -0,0 +1,6 @@
+"""Tests for the Shinobi integration.
+
+Run from the repository root after installing requirements_test.txt:
+
+    python -m pytest tests
+"""
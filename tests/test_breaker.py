@@ -0,0 +1,69 @@
+"""Tests for the circuit breaker."""
+from unittest.mock import patch
+
+from custom_components.shinobi import breaker as breaker_module
+from custom_components.shinobi.breaker import (
+    BACKOFF_MIN,
+    FAILURE_THRESHOLD,
+    CircuitBreaker,
+)
+
+
+def failing_breaker(now: float) -> CircuitBreaker:
+    # without a probe coroutine no retry is scheduled, so hass is not needed
+    breaker = CircuitBreaker(None, "test")
+    with patch.object(breaker_module, "monotonic", return_value=now):
+        for _ in range(FAILURE_THRESHOLD):
+            breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold():
+    """Test the breaker opens after consecutive failures."""
+    breaker = CircuitBreaker(None, "test")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    assert breaker.closed
+
+    breaker.record_failure()
+    assert not breaker.closed
+    assert breaker.as_dict()["backoff"] == BACKOFF_MIN
+
+
+def test_lets_one_probe_through_after_backoff():
+    """Test a single request is allowed once the backoff passed."""
+    breaker = failing_breaker(100)
+    with patch.object(breaker_module, "monotonic", return_value=100):
+        assert not breaker.allow()
+    with patch.object(breaker_module, "monotonic", return_value=100 + BACKOFF_MIN):
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+    assert breaker.closed
+
+
+def test_failed_probe_doubles_the_backoff():
+    """Test a failed probe keeps the breaker open for longer."""
+    breaker = failing_breaker(100)
+    with patch.object(breaker_module, "monotonic", return_value=100 + BACKOFF_MIN):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert not breaker.closed
+    assert breaker.as_dict()["backoff"] == 2 * BACKOFF_MIN
+
+
+def test_inconclusive_probe_is_retried():
+    """Test a probe that could not tell neither closes nor backs off."""
+    breaker = failing_breaker(100)
+    with patch.object(breaker_module, "monotonic", return_value=100 + BACKOFF_MIN):
+        assert breaker.allow()
+        breaker.record_inconclusive()
+    assert not breaker.closed
+    assert breaker.as_dict()["backoff"] == BACKOFF_MIN
+    with patch.object(
+        breaker_module, "monotonic", return_value=100 + 2 * BACKOFF_MIN
+    ):
+        assert breaker.allow()
@@ -0,0 +1,29 @@
+"""Tests for detecting changed monitors."""
+from custom_components.shinobi.coordinator import _fingerprint
+
+
+class Stream:
+    __slots__ = ("url", "type")
+
+    def __init__(self, url):
+        self.url = url
+        self.type = "hls"
+
+
+class Monitor:
+    def __init__(self, url="http://nvr/s.m3u8"):
+        self.id = "mon"
+        # deeper than any fixed limit, rebuilt on every poll
+        self.streams = {"hls": [{"main": {"variants": [Stream(url)]}}]}
+        self.tags = {"b", "a"}
+        self.me = self
+
+
+def test_rebuilt_monitor_has_the_same_fingerprint():
+    """Test equal monitors built separately compare equal."""
+    assert _fingerprint(Monitor()) == _fingerprint(Monitor())
+
+
+def test_deeply_nested_change_is_noticed():
+    """Test a change far down the monitor changes its fingerprint."""
+    assert _fingerprint(Monitor()) != _fingerprint(Monitor("http://nvr/t.m3u8"))
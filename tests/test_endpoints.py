@@ -0,0 +1,21 @@
+"""Tests for parsing the additional Shinobi nodes."""
+import pytest
+
+from custom_components.shinobi.endpoints import parse_endpoints
+
+
+def test_parse_endpoints():
+    """Test hosts with and without ports and schemes."""
+    assert parse_endpoints(" nvr2:8080, https://nvr3 ,,nvr4") == [
+        ("nvr2", 8080),
+        ("https://nvr3", None),
+        ("nvr4", None),
+    ]
+    assert parse_endpoints("") == []
+
+
+@pytest.mark.parametrize("value", ["ftp://nvr", "nvr:99999", "http://", ":8080"])
+def test_parse_endpoints_invalid(value):
+    """Test values that are not hosts are rejected."""
+    with pytest.raises(ValueError):
+        parse_endpoints(value)
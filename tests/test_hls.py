@@ -0,0 +1,64 @@
+"""Tests for the HLS proxy helpers."""
+from custom_components.shinobi.hls import (
+    PLAYLIST_LINK_TTL,
+    SEGMENT_LINK_TTL,
+    content_type,
+    is_hls_url,
+    link_ttl,
+    master_playlist,
+    rewrite_playlist,
+)
+
+PLAYLIST_URL = "http://nvr:8080/key/hls/group/mon/s.m3u8?token=abc"
+
+
+def link(name: str) -> str:
+    return f"{name}?sig=1"
+
+
+def test_rewrite_playlist_points_files_at_the_proxy():
+    """Test URIs next to the playlist are rewritten."""
+    playlist = (
+        b"#EXTM3U\n"
+        b'#EXT-X-MAP:URI="init.mp4"\n'
+        b"#EXTINF:2.0,\n"
+        b"s0.ts\n"
+        b"#EXTINF:2.0,\n"
+        b"http://nvr:8080/key/hls/group/mon/s1.ts?x=1\n"
+    )
+    assert rewrite_playlist(playlist, PLAYLIST_URL, link) == (
+        b"#EXTM3U\n"
+        b'#EXT-X-MAP:URI="init.mp4?sig=1"\n'
+        b"#EXTINF:2.0,\n"
+        b"s0.ts?sig=1\n"
+        b"#EXTINF:2.0,\n"
+        b"s1.ts?sig=1\n"
+    )
+
+
+def test_rewrite_playlist_leaves_other_urls_alone():
+    """Test URIs outside the playlist's directory are not proxied."""
+    playlist = b"#EXTM3U\nhttp://elsewhere/s0.ts\n../other/s1.ts\nsub/s2.ts\n"
+    assert rewrite_playlist(playlist, PLAYLIST_URL, link) == playlist
+
+
+def test_master_playlist():
+    """Test the master playlist wraps a single variant."""
+    assert master_playlist("s.m3u8?sig=1") == (
+        b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=2000000\ns.m3u8?sig=1\n"
+    )
+
+
+def test_link_ttl():
+    """Test playlists are linked for longer than segments."""
+    assert link_ttl("s.m3u8") == PLAYLIST_LINK_TTL
+    assert link_ttl("s0.ts") == SEGMENT_LINK_TTL
+
+
+def test_content_type():
+    """Test content types by extension."""
+    assert content_type("s.m3u8") == "application/vnd.apple.mpegurl"
+    assert content_type("s0.ts") == "video/mp2t"
+    assert content_type("s.jpg") is None
+    assert is_hls_url(PLAYLIST_URL)
+    assert not is_hls_url("http://nvr/key/mjpeg/group/mon")
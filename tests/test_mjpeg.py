@@ -0,0 +1,92 @@
+"""Tests for the MJPEG frame parsers."""
+from custom_components.shinobi.mjpeg import (
+    JPEG_EOI,
+    JPEG_SOI,
+    JpegFrameParser,
+    MultipartFrameParser,
+    parse_boundary,
+)
+
+FRAME = JPEG_SOI + b"frame" + JPEG_EOI
+
+
+def part(body: bytes, length: bool = True) -> bytes:
+    headers = b"--shinobi\r\nContent-Type: image/jpeg\r\n"
+    if length:
+        headers += b"Content-Length: %d\r\n" % len(body)
+    return headers + b"\r\n" + body + b"\r\n"
+
+
+def feed_bytewise(parser, data: bytes) -> list:
+    frames = []
+    for index in range(len(data)):
+        frames.extend(parser.feed(data[index : index + 1]))
+    return frames
+
+
+def test_parse_boundary():
+    """Test reading the boundary from a content type."""
+    assert parse_boundary('multipart/x-mixed-replace; boundary="abc"') == b"abc"
+    assert parse_boundary("multipart/x-mixed-replace;boundary=abc") == b"abc"
+    assert parse_boundary("image/jpeg") is None
+
+
+def test_jpeg_frames_split_across_reads():
+    """Test frames whose markers are split between reads."""
+    parser = JpegFrameParser()
+    assert feed_bytewise(parser, b"junk" + FRAME + FRAME) == [FRAME, FRAME]
+    assert parser.buffered == 0
+
+
+def test_jpeg_oversize_frame_is_dropped():
+    """Test an unterminated frame over the limit is dropped."""
+    parser = JpegFrameParser(max_frame_size=16)
+    assert parser.feed(JPEG_SOI + b"\x00" * 32) == []
+    assert parser.buffered == 0
+    assert parser.feed(FRAME) == [FRAME]
+
+
+def test_multipart_with_content_length():
+    """Test parts with a content length, split across reads."""
+    parser = MultipartFrameParser(b"shinobi")
+    data = part(FRAME) + part(FRAME)
+    assert feed_bytewise(parser, data) == [FRAME, FRAME]
+
+
+def test_multipart_without_content_length():
+    """Test parts delimited only by the next boundary."""
+    parser = MultipartFrameParser(b"--shinobi")
+    data = part(FRAME, length=False) + part(FRAME, length=False)
+    # the last part is only complete once the next delimiter arrives
+    assert feed_bytewise(parser, data) == [FRAME]
+    assert parser.feed(b"--shinobi\r\n") == [FRAME]
+
+
+def test_multipart_delimiter_split_across_reads():
+    """Test a delimiter split in two is still found."""
+    parser = MultipartFrameParser(b"shinobi")
+    data = b"preamble" + part(FRAME)
+    split = data.index(b"--shinobi") + 4
+    assert parser.feed(data[:split]) == []
+    assert parser.feed(data[split:]) == [FRAME]
+
+
+def test_multipart_oversize_part_is_skipped():
+    """Test a part announcing more than the limit is skipped."""
+    parser = MultipartFrameParser(b"shinobi", max_frame_size=len(FRAME))
+    big = JPEG_SOI + b"\x00" * 64 + JPEG_EOI
+    assert parser.feed(part(big) + part(FRAME)) == [FRAME]
+
+
+def test_multipart_max_size_part_is_kept():
+    """Test a complete part of exactly the limit is returned."""
+    parser = MultipartFrameParser(b"shinobi", max_frame_size=len(FRAME))
+    assert parser.feed(part(FRAME)) == [FRAME]
+
+
+def test_multipart_unbounded_buffer_is_dropped():
+    """Test a part without length that never ends does not grow forever."""
+    parser = MultipartFrameParser(b"shinobi", max_frame_size=16)
+    parser.feed(part(b"", length=False)[:-2])
+    parser.feed(b"\x00" * (64 * 1024 + 32))
+    assert parser.buffered == 0
@@ -0,0 +1,60 @@
+"""Tests for parsing stream probes."""
+from collections import namedtuple
+
+from custom_components.shinobi.probe import StreamProbe, parse_probe, pick_stream
+
+INPUT = """Input #0, rtsp, from 'rtsp://cam/stream':
+  Duration: N/A, start: 0.000000, bitrate: N/A
+    Stream #0:0: Video: h264 (Main), yuv420p(progressive), 1920x1080, 25 fps
+"""
+OUTPUT = """Stream mapping:
+  Stream #0:0 -> #0:0 (h264 (native) -> wrapped_avframe (native))
+Output #0, null, to 'pipe:':
+    Stream #0:0: Video: wrapped_avframe, yuv420p, 1920x1080, q=2-31, 200 kb/s
+"""
+
+Stream = namedtuple("Stream", "url")
+
+
+class FakeProber:
+    def __init__(self, probes):
+        self._probes = probes
+
+    def get(self, url):
+        return self._probes.get(url)
+
+
+def test_parse_probe():
+    """Test reading codec, size and bitrate of the input."""
+    output = INPUT.replace("25 fps", "25 fps, 4000 kb/s") + OUTPUT
+    assert parse_probe("url", 0.5, output) == StreamProbe(
+        "url", True, 0.5, "h264", 1920, 1080, 4000
+    )
+
+
+def test_parse_probe_ignores_output_bitrate():
+    """Test the null muxer's bitrate is not taken for the input's."""
+    assert parse_probe("url", 0.5, INPUT + OUTPUT).bitrate is None
+
+
+def test_parse_probe_unreachable():
+    """Test output without a video stream means unreachable."""
+    assert parse_probe("url", 0.5, "Connection refused") == StreamProbe(
+        "url", False, 0.5
+    )
+
+
+def test_pick_stream():
+    """Test picking the largest stream, or the cheapest for dashboards."""
+    streams = [Stream("small"), Stream("large"), Stream("down")]
+    prober = FakeProber(
+        {
+            "small": StreamProbe("small", True, 0.1, "h264", 640, 360, 500),
+            "large": StreamProbe("large", True, 0.2, "h264", 1920, 1080, 4000),
+            "down": StreamProbe("down", False, 0.1),
+        }
+    )
+    assert pick_stream(streams, prober).url == "large"
+    assert pick_stream(streams, prober, low_bitrate=True).url == "small"
+    assert pick_stream(streams[2:], prober).url == "down"
+    assert pick_stream(streams, FakeProber({})).url == "small"
@@ -0,0 +1,99 @@
+"""Tests for the ffmpeg scheduler."""
+import asyncio
+
+import pytest
+
+from custom_components.shinobi.scheduler import (
+    PRIORITY_PROBE,
+    PRIORITY_STILL,
+    PRIORITY_STREAM,
+    FFmpegScheduler,
+    NoSlotAvailable,
+)
+
+
+@pytest.mark.asyncio
+async def test_slots_are_handed_over_by_priority():
+    """Test the most urgent waiter gets a released slot first."""
+    scheduler = FFmpegScheduler(1)
+    await scheduler.async_acquire(PRIORITY_STILL)
+    order = []
+
+    async def wait(priority):
+        await scheduler.async_acquire(priority)
+        order.append(priority)
+        scheduler.release()
+
+    waiters = [
+        asyncio.ensure_future(wait(priority))
+        for priority in (PRIORITY_PROBE, PRIORITY_STREAM, PRIORITY_STILL)
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 3
+    scheduler.release()
+    await asyncio.gather(*waiters)
+    assert order == [PRIORITY_STREAM, PRIORITY_STILL, PRIORITY_PROBE]
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    """Test cancelling a queued request neither leaks nor loses a slot."""
+    scheduler = FFmpegScheduler(1)
+    await scheduler.async_acquire(PRIORITY_STILL)
+    waiter = asyncio.ensure_future(scheduler.async_acquire(PRIORITY_STREAM))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.queue_depth == 0
+
+    scheduler.release()
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_after_handoff_releases_the_slot():
+    """Test a slot handed to a waiter that was cancelled goes back."""
+    scheduler = FFmpegScheduler(1)
+    await scheduler.async_acquire(PRIORITY_STILL)
+    waiter = asyncio.ensure_future(scheduler.async_acquire(PRIORITY_STREAM))
+    await asyncio.sleep(0)
+    scheduler.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_raises_no_slot_available():
+    """Test a full scheduler reports no capacity after the timeout."""
+    scheduler = FFmpegScheduler(1)
+    await scheduler.async_acquire(PRIORITY_STREAM)
+    with pytest.raises(NoSlotAvailable):
+        await scheduler.async_run(PRIORITY_PROBE, asyncio.sleep, timeout=0.01)
+    with pytest.raises(NoSlotAvailable):
+        await scheduler.async_acquire(PRIORITY_STILL, timeout=0.01)
+    assert scheduler.queue_depth == 0
+    assert scheduler.active == 1
+
+
+@pytest.mark.asyncio
+async def test_jobs_with_the_same_key_share_one_run():
+    """Test identical pending jobs run once."""
+    scheduler = FFmpegScheduler(2)
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"image"
+
+    results = await asyncio.gather(
+        *[scheduler.async_run(PRIORITY_STILL, job, key="still") for _ in range(3)]
+    )
+    assert results == [b"image"] * 3
+    assert len(calls) == 1
+    assert scheduler.active == 0
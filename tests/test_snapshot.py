@@ -0,0 +1,99 @@
+"""Tests for the snapshot cache."""
+import asyncio
+
+import pytest
+
+from custom_components.shinobi.snapshot import SnapshotCache
+
+
+class Fetcher:
+    def __init__(self, *images):
+        self.images = list(images)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.images.pop(0) if self.images else None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_fetch():
+    """Test concurrent callers and forced refreshes join one fetch."""
+    cache = SnapshotCache(1024)
+    fetch = Fetcher(b"one")
+    results = await asyncio.gather(
+        cache.async_get("key", 10, fetch),
+        cache.async_get("key", 10, fetch),
+        cache.async_refresh("key", fetch),
+    )
+    assert results == [b"one"] * 3
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fresh_image_is_reused():
+    """Test an image is served from the cache within its ttl."""
+    cache = SnapshotCache(1024)
+    fetch = Fetcher(b"one", b"two")
+    assert await cache.async_get("key", 10, fetch) == b"one"
+    assert await cache.async_get("key", 10, fetch) == b"one"
+    assert await cache.async_get("key", 0, fetch) == b"two"
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_falls_back_to_last_image():
+    """Test a failed fetch returns the stale image, a refresh returns None."""
+    cache = SnapshotCache(1024)
+    assert await cache.async_get("key", 0, Fetcher(b"one")) == b"one"
+    assert await cache.async_get("key", 0, Fetcher()) == b"one"
+    assert await cache.async_refresh("key", Fetcher()) is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_abort_the_fetch():
+    """Test the fetch finishes for the others when one caller goes away."""
+    cache = SnapshotCache(1024)
+    fetch = Fetcher(b"one")
+    first = asyncio.ensure_future(cache.async_get("key", 10, fetch))
+    second = asyncio.ensure_future(cache.async_get("key", 10, fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == b"one"
+    assert cache.peek("key") == b"one"
+
+
+@pytest.mark.asyncio
+async def test_not_before_expires_derived_images():
+    """Test an image cached before not_before is fetched again."""
+    cache = SnapshotCache(1024)
+    await cache.async_get("base", 10, Fetcher(b"one"))
+    scaled = Fetcher(b"small one", b"small two")
+    assert (
+        await cache.async_get(
+            "scaled", 10, scaled, not_before=cache.fetched_at("base")
+        )
+        == b"small one"
+    )
+    await cache.async_refresh("base", Fetcher(b"two"))
+    assert (
+        await cache.async_get(
+            "scaled", 10, scaled, not_before=cache.fetched_at("base")
+        )
+        == b"small two"
+    )
+
+
+def test_lru_eviction_keeps_the_byte_budget():
+    """Test the least recently used images are evicted first."""
+    cache = SnapshotCache(10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.put("c", b"cccc")
+    assert cache.peek("a") is None
+    assert cache.size == 8
+    cache.put("too large", b"x" * 11)
+    assert cache.peek("too large") is None
+    cache.discard("b")
+    assert cache.size == 4
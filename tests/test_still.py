@@ -0,0 +1,65 @@
+"""Tests for the still image source selection."""
+from unittest.mock import patch
+
+from custom_components.shinobi import still as still_module
+from custom_components.shinobi.still import (
+    REEVALUATE_INTERVAL,
+    SOURCE_FFMPEG,
+    SOURCE_JPEG_API,
+    SOURCE_MJPEG_FRAME,
+    UNHEALTHY_FAILURES,
+    StillStrategy,
+)
+
+SOURCES = (SOURCE_JPEG_API, SOURCE_MJPEG_FRAME, SOURCE_FFMPEG)
+
+
+def test_cheapest_source_first():
+    """Test measured sources are ordered by latency."""
+    strategy = StillStrategy(SOURCES)
+    strategy.record(SOURCE_JPEG_API, 0.5, True)
+    strategy.record(SOURCE_MJPEG_FRAME, 0.1, True)
+    strategy.record(SOURCE_FFMPEG, 2.0, True)
+    assert strategy.candidates() == [
+        SOURCE_MJPEG_FRAME,
+        SOURCE_JPEG_API,
+        SOURCE_FFMPEG,
+    ]
+
+
+def test_unmeasured_sources_are_tried_first():
+    """Test a source without measurements is tried before measured ones."""
+    strategy = StillStrategy(SOURCES)
+    strategy.record(SOURCE_JPEG_API, 0.1, True)
+    assert strategy.candidates()[-1] == SOURCE_JPEG_API
+
+
+def test_failing_source_moves_to_the_end():
+    """Test a source failing repeatedly becomes a last resort."""
+    strategy = StillStrategy(SOURCES)
+    for source, latency in zip(SOURCES, (0.1, 0.5, 2.0)):
+        strategy.record(source, latency, True)
+    for _ in range(UNHEALTHY_FAILURES + 3):
+        strategy.record(SOURCE_JPEG_API, 0.1, False)
+    assert strategy.candidates()[-1] == SOURCE_JPEG_API
+    assert not strategy.as_dict()[SOURCE_JPEG_API]["healthy"]
+
+
+def test_alternative_is_reevaluated():
+    """Test the least recently tried alternative periodically goes first."""
+    with patch.object(still_module, "monotonic", return_value=0):
+        strategy = StillStrategy(SOURCES)
+        for source, latency in zip(SOURCES, (0.1, 0.5, 2.0)):
+            strategy.record(source, latency, True)
+    with patch.object(still_module, "monotonic", return_value=REEVALUATE_INTERVAL):
+        assert strategy.candidates()[0] != SOURCE_JPEG_API
+        assert strategy.candidates()[0] == SOURCE_JPEG_API
+
+
+def test_update_sources_keeps_measurements():
+    """Test changing the sources keeps what was measured."""
+    strategy = StillStrategy(SOURCES)
+    strategy.record(SOURCE_FFMPEG, 2.0, True)
+    strategy.update_sources((SOURCE_JPEG_API, SOURCE_FFMPEG))
+    assert set(strategy.as_dict()) == {SOURCE_JPEG_API, SOURCE_FFMPEG}
+    assert strategy.as_dict()[SOURCE_FFMPEG]["latency"] == 2.0